@@ -1,8 +1,13 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from src.models.model import ComplianceAI
+from src.models.bundles import parse_bundle_options
 from src.services.pdf_service import PDFService
 from src.services.analysis_service import AnalysisService
+from src.services.text_normalizer import TextNormalizer
+from src.services.scheduler import PriorityScheduler, SchedulerTimeout, PRIORITY_CLASSES, parse_tenant_weights
+from src.services.results_aggregator import ResultsAggregator
+from src.routes.results import create_results_blueprint
 import os
 from dotenv import load_dotenv
 
@@ -14,21 +19,61 @@ CORS(app)
 
 # Initialize folders
 UPLOAD_FOLDER = 'uploads'
+EXTRACTION_MODE = os.getenv('PDF_EXTRACTION_MODE', 'full')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 # Initialize services
 ai_model = ComplianceAI()
 pdf_service = PDFService()
+text_normalizer = TextNormalizer()
 analysis_service = AnalysisService(ai_model)
+results_aggregator = ResultsAggregator()
+app.register_blueprint(create_results_blueprint(results_aggregator))
+scheduler = PriorityScheduler(
+    max_workers=int(os.getenv('SCHEDULER_MAX_WORKERS', '8')),
+    class_caps={
+        'interactive': int(os.getenv('SCHEDULER_INTERACTIVE_CAP', '8')),
+        'bulk': int(os.getenv('SCHEDULER_BULK_CAP', '4')),
+        'background': int(os.getenv('SCHEDULER_BACKGROUND_CAP', '1'))
+    },
+    tenant_weights=parse_tenant_weights(os.getenv('SCHEDULER_TENANT_WEIGHTS', '')),
+    queue_timeout=float(os.getenv('SCHEDULER_QUEUE_TIMEOUT', '300'))
+)
 
 # Setup AI models
 ai_model.setup_models()
 
+def _request_priority(default):
+    """Priority class and tenant for the current request (X-Priority / X-Tenant-ID headers)
+
+    Without a tenant header the client address is the tenant, so anonymous
+    callers still take turns instead of sharing one fair-queuing share.
+    """
+    priority = request.headers.get('X-Priority', default).lower()
+    if priority not in PRIORITY_CLASSES:
+        priority = default
+    return priority, request.headers.get('X-Tenant-ID') or request.remote_addr or 'default'
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({'status': 'healthy', 'service': 'AI/ML Compliance Service'})
 
+@app.route('/usage', methods=['GET'])
+def token_usage():
+    """Token usage totals by endpoint, document and rule"""
+    return jsonify(ai_model.get_token_usage())
+
+@app.route('/scheduler', methods=['GET'])
+def scheduler_metrics():
+    """Queue depth and queue-wait metrics per priority class"""
+    return jsonify(scheduler.snapshot())
+
+@app.route('/engines', methods=['GET'])
+def engine_stats():
+    """Share of script requests served by each generation tier"""
+    return jsonify(ai_model.get_engine_stats())
+
 @app.route('/analyze_document', methods=['POST'])
 def analyze_document():
     """Analyze uploaded compliance document"""
@@ -39,24 +84,53 @@ def analyze_document():
     if file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
 
+    # Validate page ranges before queuing or saving anything
+    mode = request.form.get('extraction', EXTRACTION_MODE)
+    page_ranges = None
+    if request.form.get('pages'):
+        try:
+            page_ranges = pdf_service.parse_page_spec(request.form['pages'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+    priority, tenant = _request_priority('bulk')
+    # Larger uploads count as bigger jobs for fair queuing (1 unit per MB)
+    cost = max(1.0, (request.content_length or 0) / (1024 * 1024))
+    file_path = os.path.join(UPLOAD_FOLDER, file.filename)
+
     try:
-        # Save file
-        file_path = os.path.join(UPLOAD_FOLDER, file.filename)
-        file.save(file_path)
+        with scheduler.slot(priority, tenant, cost):
+            # Save file
+            file.save(file_path)
 
-        # Extract text from PDF
-        text = pdf_service.extract_text_from_pdf(file_path)
+            # Extract text from PDF (rules mode skips front matter and appendices)
+            if mode == 'rules' or page_ranges:
+                pages, extraction = pdf_service.extract_rule_pages(file_path, page_ranges)
+            else:
+                pages = pdf_service.extract_pages_from_pdf(file_path)
+                extraction = {'mode': 'full', 'pages_extracted': len(pages), 'pages_skipped': 0}
 
-        # Analyze document with AI
-        analysis = analysis_service.analyze_compliance_document(text)
+            # Strip headers/footers and layout noise before parsing
+            text, normalization = text_normalizer.normalize_pages(pages)
 
-        # Clean up uploaded file
-        os.remove(file_path)
+            # Analyze document with AI
+            analysis = analysis_service.analyze_compliance_document(text)
+            analysis['normalization'] = normalization
+            analysis['extraction'] = extraction
 
         return jsonify(analysis)
 
+    except SchedulerTimeout as e:
+        return jsonify({'error': str(e)}), 503
+    except ValueError as e:
+        # Page ranges that select nothing in this document
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    finally:
+        # Clean up uploaded file
+        if os.path.exists(file_path):
+            os.remove(file_path)
 
 @app.route('/generate_script', methods=['POST'])
 def generate_script():
@@ -67,17 +141,58 @@ def generate_script():
     if not all(field in data for field in required_fields):
         return jsonify({'error': 'Missing required fields'}), 400
 
+    priority, tenant = _request_priority('interactive')
+
+    try:
+        with scheduler.slot(priority, tenant):
+            result = ai_model.generate_script_result(
+                policy=data['policy'],
+                audit_remediation=data['auditRemediation'],
+                os_type=data['os'],
+                use_ai=data.get('useAI', True),
+                remediation_steps=data.get('remediationSteps'),
+                document_id=data.get('documentId')
+            )
+
+        return jsonify(result)
+
+    except SchedulerTimeout as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/generate_bundle', methods=['POST'])
+def generate_bundle():
+    """Generate one audit/remediation script covering many policies"""
+    data = request.get_json()
+    
+    required_fields = ['policies', 'auditRemediation', 'os']
+    if not data or not all(field in data for field in required_fields):
+        return jsonify({'error': 'Missing required fields'}), 400
+
     try:
-        script = ai_model.generate_script(
-            policy=data['policy'],
-            audit_remediation=data['auditRemediation'],
-            os_type=data['os'],
-            use_ai=data.get('useAI', True),
-            remediation_steps=data.get('remediationSteps')
-        )
+        max_parallel, check_timeout = parse_bundle_options(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-        return jsonify({'script': script})
+    priority, tenant = _request_priority('bulk')
 
+    try:
+        with scheduler.slot(priority, tenant, cost=max(1.0, len(data['policies']) / 10)):
+            bundle = ai_model.generate_bundle(
+                policies=data['policies'],
+                audit_remediation=data['auditRemediation'],
+                os_type=data['os'],
+                use_ai=data.get('useAI', True),
+                document_id=data.get('documentId'),
+                max_parallel=max_parallel,
+                check_timeout=check_timeout
+            )
+
+        return jsonify(bundle)
+
+    except SchedulerTimeout as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
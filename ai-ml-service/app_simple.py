@@ -3,6 +3,10 @@ from flask_cors import CORS
 import os
 import json
 from dotenv import load_dotenv
+from src.models.bundles import build_bundle, parse_bundle_options
+from src.models.engines import EngineRegistry, MockEngine, RuleEngine, extract_policy_info, load_templates, render_script
+from src.services.results_aggregator import ResultsAggregator
+from src.routes.results import create_results_blueprint
 
 # Load environment variables
 load_dotenv()
@@ -18,6 +22,11 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 class SimpleComplianceAI:
     def __init__(self):
         self.frameworks = ['CIS', 'NIST', 'ISO27001', 'SOX']
+        self.templates, self.functions = load_templates()
+        # Same engine registry as app.py, with canned scripts in place of the LLM
+        self.engines = EngineRegistry()
+        self.engines.register(RuleEngine())
+        self.engines.register(MockEngine())
     
     def analyze_policy_document(self, text):
         """Simple policy analysis without heavy AI dependencies"""
@@ -60,91 +69,50 @@ class SimpleComplianceAI:
             }
         }
     
+    def generate_script(self, policy, script_type='audit', os_type='windows', remediation_steps=None):
+        """Generate a script with the rule fast path, falling back to canned mock scripts"""
+        os_key = 'windows' if os_type.lower() == 'windows' else 'linux'
+        policy_info = extract_policy_info(policy)
+        result = self.engines.generate({
+            'policy': policy,
+            'policy_info': policy_info,
+            'script_type': script_type,
+            'os_type': os_type,
+            'os_key': os_key,
+            'remediation_steps': remediation_steps,
+            'use_ai': False,
+            'document_id': None
+        })
+        script = render_script(self.templates[os_key][script_type], self.functions[os_key],
+                               policy_info, script_type, result)
+        return {'script': script, 'engine': result['engine'], 'confidence': result['confidence']}
+
+    def generate_bundle(self, policies, script_type='audit', os_type='windows', max_parallel=4, check_timeout=300):
+        """Generate one script covering many policies with a shared helper library"""
+        os_key = 'windows' if os_type.lower() == 'windows' else 'linux'
+        return build_bundle(
+            policies,
+            lambda policy, policy_info: self.engines.generate({
+                'policy': policy,
+                'policy_info': policy_info,
+                'script_type': script_type,
+                'os_type': os_type,
+                'os_key': os_key,
+                'remediation_steps': None,
+                'use_ai': False,
+                'document_id': None
+            }),
+            self.templates[os_key]['bundle'], self.functions[os_key],
+            os_key, script_type, max_parallel, check_timeout
+        )
+
     def generate_audit_script(self, requirements, os_type='windows'):
         """Generate basic audit script"""
-        if os_type.lower() == 'windows':
-            return '''# Windows Audit Script
-# Generated by ComplianceAI
-
-Write-Host "Starting compliance audit..."
-
-# Check password policy
-$passwordPolicy = Get-LocalSecurityPolicy | Where-Object { $_.Name -eq "PasswordPolicy" }
-Write-Host "Password policy check: $($passwordPolicy.Status)"
-
-# Check account lockout policy  
-$lockoutPolicy = Get-LocalSecurityPolicy | Where-Object { $_.Name -eq "AccountLockoutPolicy" }
-Write-Host "Account lockout policy check: $($lockoutPolicy.Status)"
-
-Write-Host "Audit completed."'''
-        else:
-            return '''#!/bin/bash
-# Linux Audit Script
-# Generated by ComplianceAI
-
-echo "Starting compliance audit..."
-
-# Check password policy
-if [ -f /etc/security/pwquality.conf ]; then
-    echo "Password policy file exists"
-    grep -E "minlen|minclass" /etc/security/pwquality.conf
-else
-    echo "Password policy file not found"
-fi
-
-# Check account lockout settings
-if [ -f /etc/security/faillock.conf ]; then
-    echo "Account lockout configuration exists"
-    grep -E "deny|unlock_time" /etc/security/faillock.conf
-else
-    echo "Account lockout configuration not found"
-fi
-
-echo "Audit completed."'''
+        return self.generate_script('\n'.join(map(str, requirements)), 'audit', os_type)['script']
     
     def generate_remediation_script(self, requirements, os_type='windows'):
         """Generate basic remediation script"""
-        if os_type.lower() == 'windows':
-            return '''# Windows Remediation Script
-# Generated by ComplianceAI
-# WARNING: This script modifies system settings
-
-Write-Host "Starting compliance remediation..."
-
-# Set password policy
-Write-Host "Configuring password policy..."
-secedit /configure /db $env:temp\\secpol.sdb /cfg $env:temp\\secpol.inf /quiet
-
-# Set account lockout policy
-Write-Host "Configuring account lockout policy..."
-net accounts /lockoutthreshold:5 /lockoutduration:30 /lockoutwindow:30
-
-Write-Host "Remediation completed."'''
-        else:
-            return '''#!/bin/bash
-# Linux Remediation Script
-# Generated by ComplianceAI
-# WARNING: This script modifies system settings
-
-echo "Starting compliance remediation..."
-
-# Configure password policy
-echo "Configuring password policy..."
-if [ -f /etc/security/pwquality.conf ]; then
-    cp /etc/security/pwquality.conf /etc/security/pwquality.conf.backup
-    echo "minlen = 12" >> /etc/security/pwquality.conf
-    echo "minclass = 3" >> /etc/security/pwquality.conf
-fi
-
-# Configure account lockout
-echo "Configuring account lockout..."
-if [ -f /etc/security/faillock.conf ]; then
-    cp /etc/security/faillock.conf /etc/security/faillock.conf.backup
-    echo "deny = 5" >> /etc/security/faillock.conf
-    echo "unlock_time = 1800" >> /etc/security/faillock.conf
-fi
-
-echo "Remediation completed."'''
+        return self.generate_script('\n'.join(map(str, requirements)), 'remediation', os_type)['script']
     
     def validate_script_syntax(self, script, os_type):
         """Simple script validation"""
@@ -159,12 +127,19 @@ echo "Remediation completed."'''
 
 # Initialize AI service
 ai_model = SimpleComplianceAI()
+results_aggregator = ResultsAggregator()
+app.register_blueprint(create_results_blueprint(results_aggregator))
 
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({'status': 'healthy', 'service': 'AI/ML ComplianceAI'})
 
+@app.route('/engines', methods=['GET'])
+def engine_stats():
+    return jsonify(ai_model.engines.stats())
+
 @app.route('/analyze-document', methods=['POST'])
+@app.route('/analyze_document', methods=['POST'])
 def analyze_document():
     if 'file' not in request.files:
         return jsonify({'error': 'No file provided'}), 400
@@ -198,19 +173,18 @@ def generate_script():
         return jsonify({'error': 'Missing requirements'}), 400
     
     requirements = data['requirements']
-    script_type = data.get('script_type', 'audit')
-    os_type = data.get('os_type', 'windows')
+    script_type = data.get('script_type', data.get('type', 'audit'))
+    os_type = data.get('os_type', data.get('os', 'windows'))
+    
+    if script_type not in ('audit', 'remediation'):
+        return jsonify({'error': 'Invalid script type'}), 400
     
     try:
-        if script_type == 'audit':
-            script = ai_model.generate_audit_script(requirements, os_type)
-        elif script_type == 'remediation':
-            script = ai_model.generate_remediation_script(requirements, os_type)
-        else:
-            return jsonify({'error': 'Invalid script type'}), 400
+        result = ai_model.generate_script('\n'.join(map(str, requirements)), script_type, os_type)
         
         return jsonify({
-            'script': script,
+            'script': result['script'],
+            'engine': result['engine'],
             'script_type': script_type,
             'os_type': os_type
         })
@@ -218,7 +192,61 @@ def generate_script():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/generate_script', methods=['POST'])
+def generate_script_compat():
+    """Same request contract as app.py"""
+    data = request.get_json()
+    
+    required_fields = ['policy', 'auditRemediation', 'os']
+    if not data or not all(field in data for field in required_fields):
+        return jsonify({'error': 'Missing required fields'}), 400
+    
+    if data['auditRemediation'].lower() not in ('audit', 'remediation'):
+        return jsonify({'error': 'Invalid script type'}), 400
+    
+    try:
+        result = ai_model.generate_script(
+            data['policy'],
+            data['auditRemediation'].lower(),
+            data['os'],
+            remediation_steps=data.get('remediationSteps')
+        )
+        return jsonify(result)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/generate_bundle', methods=['POST'])
+def generate_bundle():
+    """Same request contract as app.py"""
+    data = request.get_json()
+    
+    required_fields = ['policies', 'auditRemediation', 'os']
+    if not data or not all(field in data for field in required_fields):
+        return jsonify({'error': 'Missing required fields'}), 400
+    
+    if data['auditRemediation'].lower() not in ('audit', 'remediation'):
+        return jsonify({'error': 'Invalid script type'}), 400
+    
+    try:
+        max_parallel, check_timeout = parse_bundle_options(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        return jsonify(ai_model.generate_bundle(
+            data['policies'],
+            data['auditRemediation'].lower(),
+            data['os'],
+            max_parallel=max_parallel,
+            check_timeout=check_timeout
+        ))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/validate-script', methods=['POST'])
+@app.route('/validate_script', methods=['POST'])
 def validate_script():
     data = request.get_json()
     
@@ -0,0 +1,424 @@
+"""
+Load and soak test harness for the AI/ML compliance service.
+
+Replays a weighted mix of PDF uploads, script generation bursts and script
+validation calls against the Flask app and reports latency percentiles,
+throughput, error rate and server RSS growth.
+
+Examples (run from ai-ml-service/):
+
+    # Start the app with the offline LLM stand-in and run a 60s test
+    python loadtest/load_test.py --spawn --concurrency 8 --duration 60
+
+    # Ramp concurrency to find the saturation point
+    python loadtest/load_test.py --spawn --ramp 1,2,4,8,16,32 --step-duration 30
+
+    # One hour soak against an already running instance
+    python loadtest/load_test.py --url http://localhost:5001 --server-pid 1234 --duration 3600
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Relative weights of each scenario in the traffic mix
+DEFAULT_MIX = {
+    'analyze_document': 1,
+    'script_burst': 3,
+    'validate_script': 2
+}
+
+# Page counts for the generated benchmark-like PDFs
+PDF_SIZES = (2, 10, 40, 120)
+
+POLICIES = [
+    "1.1.1.1 Ensure 'cramfs' kernel module is not available (L1)",
+    "3.3.1 Ensure 'ip forwarding' is disabled (L1)",
+    "5.2.4 Ensure 'sshd access' is configured (L1)",
+    "6.1.1 Ensure 'permissions on /etc/passwd' are configured (L1)",
+    "2.3.1.1 Ensure 'Accounts: Block Microsoft accounts' is set (L1)",
+    "18.9.4.1 Ensure 'Windows Defender service' is running (L2)"
+]
+
+
+def build_pdf(page_count):
+    """Build an in-memory PDF that looks like a CIS benchmark section."""
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    for page_num in range(page_count):
+        page = doc.new_page()
+        lines = ["CIS Ubuntu Linux 22.04 LTS Benchmark v1.0.0", ""]
+        rule = f"{page_num // 3 + 1}.{page_num % 3 + 1}.1"
+        lines.append(f"{rule} Ensure 'setting {page_num}' is configured (L1)")
+        lines.append("Description:")
+        lines.extend(
+            f"The recommended configuration for item {i} reduces the attack surface of the host."
+            for i in range(20)
+        )
+        lines.append("Audit:")
+        lines.append(f"# sysctl net.ipv4.conf.all.setting_{page_num}")
+        lines.append("Remediation:")
+        lines.append(f"# sysctl -w net.ipv4.conf.all.setting_{page_num}=0")
+        lines.append("")
+        lines.append(f"Page {page_num + 1}")
+        page.insert_text((50, 50), "\n".join(lines), fontsize=8)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def encode_multipart(field, filename, content, content_type='application/pdf'):
+    """Encode a single file as multipart/form-data."""
+    boundary = uuid.uuid4().hex
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    return head + content + tail, f"multipart/form-data; boundary={boundary}"
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def read_rss_kb(pid):
+    """Return the resident set size of a process in KiB (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class Recorder:
+    """Thread-safe collection of request samples."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = []
+
+    def record(self, endpoint, latency_ms, ok):
+        with self.lock:
+            self.samples.append((endpoint, latency_ms, ok))
+
+    def drain(self):
+        with self.lock:
+            samples, self.samples = self.samples, []
+        return samples
+
+
+class RSSSampler(threading.Thread):
+    """Periodically samples server RSS while a run is in progress."""
+
+    def __init__(self, pid, interval):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self.stop_event = threading.Event()
+
+    def run(self):
+        start = time.time()
+        while not self.stop_event.is_set():
+            rss = read_rss_kb(self.pid)
+            if rss is not None:
+                self.samples.append((round(time.time() - start, 1), rss))
+            self.stop_event.wait(self.interval)
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+    def summary(self):
+        if not self.samples:
+            return None
+        values = [rss for _, rss in self.samples]
+        return {
+            'start_kb': values[0],
+            'end_kb': values[-1],
+            'max_kb': max(values),
+            'growth_kb': values[-1] - values[0],
+            'samples': len(values),
+            'timeline': self.samples
+        }
+
+
+class LoadClient:
+    """Issues requests for each scenario in the traffic mix."""
+
+    def __init__(self, base_url, recorder, pdfs, burst_size, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.pdfs = pdfs
+        self.burst_size = burst_size
+        self.timeout = timeout
+
+    def _request(self, endpoint, body, content_type):
+        req = urllib.request.Request(
+            f"{self.base_url}/{endpoint}",
+            data=body,
+            headers={'Content-Type': content_type},
+            method='POST'
+        )
+        start = time.perf_counter()
+        payload = None
+        ok = False
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                payload = resp.read()
+                ok = 200 <= resp.status < 300
+        except (urllib.error.URLError, OSError, http.client.HTTPException):
+            # HTTPException covers truncated responses (IncompleteRead, BadStatusLine) under saturation
+            ok = False
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.recorder.record(endpoint, latency_ms, ok)
+        if ok and payload:
+            try:
+                return json.loads(payload)
+            except ValueError:
+                return None
+        return None
+
+    def _post_json(self, endpoint, data):
+        return self._request(endpoint, json.dumps(data).encode(), 'application/json')
+
+    def analyze_document(self):
+        pages = random.choice(list(self.pdfs))
+        body, content_type = encode_multipart('file', f"benchmark_{pages}p_{uuid.uuid4().hex[:8]}.pdf", self.pdfs[pages])
+        self._request('analyze_document', body, content_type)
+
+    def script_burst(self):
+        for _ in range(self.burst_size):
+            os_type = random.choice(['linux', 'windows'])
+            result = self._post_json('generate_script', {
+                'policy': random.choice(POLICIES),
+                'auditRemediation': random.choice(['audit', 'remediation']),
+                'os': os_type
+            })
+            if result and 'script' in result:
+                self._post_json('validate_script', {'script': result['script'], 'os_type': os_type})
+
+    def validate_script(self):
+        os_type = random.choice(['linux', 'windows'])
+        script = "#!/bin/bash\nset -e\nsysctl -n net.ipv4.ip_forward\n" if os_type == 'linux' \
+            else "# error handling\nGet-Service -Name WinDefend\n"
+        self._post_json('validate_script', {'script': script, 'os_type': os_type})
+
+
+def run_phase(client, mix, concurrency, duration):
+    """Run the traffic mix at a fixed concurrency and return the samples."""
+    scenarios = list(mix)
+    weights = [mix[name] for name in scenarios]
+    stop_event = threading.Event()
+
+    def worker():
+        while not stop_event.is_set():
+            scenario = random.choices(scenarios, weights=weights)[0]
+            getattr(client, scenario)()
+
+    client.recorder.drain()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    start = time.time()
+    for t in threads:
+        t.start()
+    stop_event.wait(duration)
+    stop_event.set()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - start
+    return client.recorder.drain(), elapsed
+
+
+def summarize(samples, elapsed):
+    """Compute latency percentiles, throughput and error rate per endpoint."""
+    def stats(rows):
+        latencies = sorted(latency for _, latency, _ in rows)
+        errors = sum(1 for _, _, ok in rows if not ok)
+        return {
+            'requests': len(rows),
+            'errors': errors,
+            'error_rate': round(errors / len(rows), 4) if rows else 0.0,
+            'throughput_rps': round(len(rows) / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': _round(percentile(latencies, 50)),
+            'p95_ms': _round(percentile(latencies, 95)),
+            'p99_ms': _round(percentile(latencies, 99)),
+            'max_ms': _round(latencies[-1] if latencies else None)
+        }
+
+    by_endpoint = {}
+    for row in samples:
+        by_endpoint.setdefault(row[0], []).append(row)
+
+    return {
+        'duration_s': round(elapsed, 1),
+        'overall': stats(samples),
+        'endpoints': {name: stats(rows) for name, rows in sorted(by_endpoint.items())}
+    }
+
+
+def _round(value):
+    return round(value, 1) if value is not None else None
+
+
+def find_saturation(steps, p95_limit_ms, error_limit, min_gain):
+    """Return the highest concurrency level before latency or errors collapse."""
+    best = None
+    previous_rps = 0.0
+    for step in steps:
+        overall = step['summary']['overall']
+        p95 = overall['p95_ms'] or 0
+        rps = overall['throughput_rps']
+        if p95 > p95_limit_ms or overall['error_rate'] > error_limit:
+            return best, f"p95/error limit exceeded at concurrency {step['concurrency']}"
+        if best is not None and rps < previous_rps * (1 + min_gain):
+            return best, f"throughput stopped scaling at concurrency {step['concurrency']}"
+        best = step['concurrency']
+        previous_rps = rps
+    return best, 'limits not reached'
+
+
+def spawn_server(port):
+    """Start app.py with the offline LLM stand-in (no reloader)."""
+    env = dict(os.environ)
+    env.setdefault('LLM_PROVIDER', 'local')
+    code = f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"
+    return subprocess.Popen(
+        [sys.executable, '-c', code],
+        cwd=SERVICE_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+
+
+def wait_for_health(base_url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url.rstrip('/')}/health", timeout=2) as resp:
+                if resp.status == 200:
+                    return True
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def print_summary(title, summary):
+    print(f"\n== {title} ({summary['duration_s']}s) ==")
+    print(f"{'endpoint':<20}{'reqs':>8}{'err%':>8}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    rows = list(summary['endpoints'].items()) + [('ALL', summary['overall'])]
+    for name, s in rows:
+        print(f"{name:<20}{s['requests']:>8}{s['error_rate'] * 100:>7.1f}%{s['throughput_rps']:>9}"
+              f"{s['p50_ms'] or '-':>9}{s['p95_ms'] or '-':>9}{s['p99_ms'] or '-':>9}")
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        name, weight = item.split('=')
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown scenario: {name}")
+        mix[name] = float(weight)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load and soak test the AI/ML compliance service')
+    parser.add_argument('--url', default='http://127.0.0.1:5001', help='Base URL of the service')
+    parser.add_argument('--spawn', action='store_true', help='Start app.py locally with LLM_PROVIDER=local')
+    parser.add_argument('--server-pid', type=int, help='PID of the server to sample RSS from')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run (soak: use a large value)')
+    parser.add_argument('--ramp', help='Comma separated concurrency levels, e.g. 1,2,4,8,16')
+    parser.add_argument('--step-duration', type=float, default=20, help='Seconds per ramp step')
+    parser.add_argument('--p95-limit-ms', type=float, default=5000, help='Saturation threshold for p95 latency')
+    parser.add_argument('--error-limit', type=float, default=0.01, help='Saturation threshold for error rate')
+    parser.add_argument('--min-gain', type=float, default=0.05, help='Minimum throughput gain per ramp step')
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help='Scenario weights, e.g. analyze_document=1,script_burst=3,validate_script=2')
+    parser.add_argument('--pdf-sizes', default=','.join(str(p) for p in PDF_SIZES), help='PDF page counts')
+    parser.add_argument('--burst-size', type=int, default=5, help='Scripts generated per burst')
+    parser.add_argument('--timeout', type=float, default=120, help='Per request timeout in seconds')
+    parser.add_argument('--rss-interval', type=float, default=5, help='Seconds between RSS samples')
+    parser.add_argument('--json-out', help='Write the full report as JSON to this path')
+    args = parser.parse_args(argv)
+
+    server = None
+    pid = args.server_pid
+    if args.spawn:
+        port = int(args.url.rsplit(':', 1)[-1].split('/')[0])
+        server = spawn_server(port)
+        pid = server.pid
+
+    try:
+        if not wait_for_health(args.url):
+            print(f"Service at {args.url} did not become healthy", file=sys.stderr)
+            return 1
+
+        pdfs = {}
+        if args.mix.get('analyze_document'):
+            pdfs = {int(p): build_pdf(int(p)) for p in args.pdf_sizes.split(',')}
+
+        client = LoadClient(args.url, Recorder(), pdfs, args.burst_size, args.timeout)
+        sampler = RSSSampler(pid, args.rss_interval) if pid else None
+        if sampler:
+            sampler.start()
+
+        report = {'url': args.url, 'mix': args.mix}
+        if args.ramp:
+            steps = []
+            for level in (int(c) for c in args.ramp.split(',')):
+                samples, elapsed = run_phase(client, args.mix, level, args.step_duration)
+                summary = summarize(samples, elapsed)
+                steps.append({'concurrency': level, 'summary': summary})
+                print_summary(f"concurrency {level}", summary)
+            saturation, reason = find_saturation(steps, args.p95_limit_ms, args.error_limit, args.min_gain)
+            report['ramp'] = steps
+            report['saturation'] = {'concurrency': saturation, 'reason': reason}
+            print(f"\nSaturation point: concurrency {saturation} ({reason})")
+        else:
+            samples, elapsed = run_phase(client, args.mix, args.concurrency, args.duration)
+            report['summary'] = summarize(samples, elapsed)
+            print_summary(f"concurrency {args.concurrency}", report['summary'])
+
+        if sampler:
+            sampler.stop()
+            report['rss'] = sampler.summary()
+            if report['rss']:
+                rss = report['rss']
+                print(f"\nServer RSS: start {rss['start_kb']} KiB, end {rss['end_kb']} KiB, "
+                      f"max {rss['max_kb']} KiB, growth {rss['growth_kb']} KiB")
+
+        if args.json_out:
+            with open(args.json_out, 'w') as f:
+                json.dump(report, f, indent=2)
+        return 0
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
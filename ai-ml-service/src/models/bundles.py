@@ -0,0 +1,150 @@
+import re
+import shlex
+from typing import Callable, Dict, List, Tuple
+
+from src.models.engines import extract_policy_info, flatten_functions
+
+FUNCTION_NAME_RE = re.compile(r'function\s+([\w-]+)')
+
+
+def _section_body(result: Dict, os_key: str) -> str:
+    """Steps for one rule, left unindented so heredocs keep working.
+
+    Complete scripts (mock engine) are embedded as-is.
+    """
+    body = result['script'] if 'script' in result else result['steps']
+    if body.strip():
+        return body
+    return "Write-Log 'No steps generated'" if os_key == 'windows' else "log 'No steps generated'"
+
+
+def _referenced_helpers(functions: Dict, bodies: List[str]) -> List[str]:
+    """Helper sources whose function name is called from any rule section."""
+    text = '\n'.join(bodies)
+    helpers = []
+    for code in flatten_functions(functions).values():
+        match = FUNCTION_NAME_RE.search(code)
+        if match and re.search(r'(?<![\w-])' + re.escape(match.group(1)) + r'(?![\w-])', text):
+            helpers.append(code)
+    return helpers
+
+
+def _parallel_setting(os_key: str, script_type: str, max_parallel: int) -> str:
+    """Parallelism line for the template; remediation always runs rules in sequence."""
+    if script_type == 'remediation':
+        setting = '$MaxParallel = 1' if os_key == 'windows' else 'MAX_PARALLEL=1'
+        return setting + '  # remediation rules always run in sequence'
+    if os_key == 'windows':
+        return f'$MaxParallel = if ($env:MAX_PARALLEL) {{ [int]$env:MAX_PARALLEL }} else {{ {max_parallel} }}'
+    return f'MAX_PARALLEL=${{MAX_PARALLEL:-{max_parallel}}}'
+
+
+def render_bundle(template: str,
+                  functions: Dict,
+                  os_key: str,
+                  script_type: str,
+                  sections: List[Dict],
+                  max_parallel: int = 4,
+                  check_timeout: int = 300) -> str:
+    """
+    Render one script covering many rules.
+
+    Args:
+        template: Platform bundle template
+        functions: Platform helper library (functions.json)
+        os_key: 'linux' or 'windows'
+        script_type: 'audit' or 'remediation'
+        sections: Dicts with ``rule_id`` and the engine ``result`` for that rule
+        max_parallel: Default number of audit rules run concurrently (MAX_PARALLEL overrides)
+        check_timeout: Default seconds per rule before it is stopped, 0 disables (CHECK_TIMEOUT
+            overrides); remediation bundles default to no timeout
+
+    Returns:
+        Script text with shared helpers emitted once and one isolated section per rule
+    """
+    bodies = [_section_body(section['result'], os_key) for section in sections]
+    rule_ids = [section['rule_id'] for section in sections]
+
+    if os_key == 'windows':
+        rendered = [
+            f"@{{ Id = '{rule_id}'; Body = {{\n{body}\n}} }}"
+            for rule_id, body in zip(rule_ids, bodies)
+        ]
+        invocations = ''
+    else:
+        names = [f"rule_{i + 1}_" + re.sub(r'\W', '_', rule_id) for i, rule_id in enumerate(rule_ids)]
+        rendered = [f"{name}() {{\n{body}\n}}" for name, body in zip(names, bodies)]
+        invocations = '\n'.join(
+            f'start_rule {i + 1} "{rule_id}" {name}' for i, (rule_id, name) in enumerate(zip(rule_ids, names))
+        )
+
+    return template.format(
+        script_type=script_type,
+        script_type_title=script_type.capitalize(),
+        rule_count=len(sections),
+        rule_ids=', '.join(rule_ids),
+        rule_id_words=' '.join(shlex.quote(rule_id) for rule_id in rule_ids),
+        helpers='\n\n'.join(_referenced_helpers(functions, bodies)),
+        sections='\n\n'.join(rendered),
+        invocations=invocations,
+        parallel_setting=_parallel_setting(os_key, script_type, max_parallel),
+        check_timeout=0 if script_type == 'remediation' else check_timeout
+    )
+
+
+def parse_bundle_options(data: Dict) -> Tuple[int, int]:
+    """
+    Validate policies and read maxParallel and checkTimeout from a /generate_bundle request.
+
+    Returns:
+        (max_parallel, check_timeout)
+
+    Raises:
+        ValueError: If policies is not a non-empty list of strings, either option is not a whole
+            number, maxParallel is below 1 or checkTimeout is negative
+    """
+    policies = data.get('policies')
+    if not isinstance(policies, list) or not policies or not all(isinstance(p, str) and p.strip() for p in policies):
+        raise ValueError("policies must be a non-empty list of policy texts")
+
+    options = []
+    for field, default, minimum in (('maxParallel', 4, 1), ('checkTimeout', 300, 0)):
+        value = data.get(field, default)
+        if isinstance(value, bool) or not str(value).strip().isdigit() or int(value) < minimum:
+            raise ValueError(f"{field} must be a whole number of at least {minimum}")
+        options.append(int(value))
+    return options[0], options[1]
+
+
+def build_bundle(policies: List[str],
+                 generate: Callable[[str, Dict], Dict],
+                 template: str,
+                 functions: Dict,
+                 os_key: str,
+                 script_type: str,
+                 max_parallel: int = 4,
+                 check_timeout: int = 300) -> Dict:
+    """
+    Run each policy through the engine tiers and render the bundle.
+
+    Args:
+        policies: Policy texts, one rule each
+        generate: Called with (policy, policy_info); returns the engine result for that rule
+        template, functions, os_key, script_type, max_parallel, check_timeout: As for render_bundle
+
+    Returns:
+        Dict with the ``script`` and the ``engine`` and ``confidence`` used for each rule
+    """
+    sections = []
+    for index, policy in enumerate(policies):
+        policy_info = extract_policy_info(policy)
+        sections.append({'rule_id': policy_info['id'] or f"rule_{index + 1}", 'result': generate(policy, policy_info)})
+
+    script = render_bundle(template, functions, os_key, script_type, sections, max_parallel, check_timeout)
+    return {
+        'script': script,
+        'rules': [
+            {'rule_id': s['rule_id'], 'engine': s['result']['engine'], 'confidence': s['result']['confidence']}
+            for s in sections
+        ]
+    }
@@ -0,0 +1,428 @@
+import json
+import os
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'templates')
+
+PLATFORM_DIRS = {
+    'windows': 'windows/powershell',
+    'linux': 'linux/bash'
+}
+
+SYSCTL_RE = re.compile(r'sysctl\s+-w\s+([a-z0-9_\-]+(?:\.[a-z0-9_\-]+)+)\s*=\s*([^\s"\']+)')
+SYSCTL_CONF_RE = re.compile(r'^\s*((?:net|kernel|fs|vm)(?:\.[a-z0-9_\-]+)+)\s*=\s*(\S+)\s*$', re.MULTILINE)
+# Write-only parameters trigger an action (e.g. a route cache flush); they cannot be read back or persisted
+WRITE_ONLY_SYSCTL_RE = re.compile(r'\.flush$|^vm\.(?:drop_caches|compact_memory)$')
+CHMOD_RE = re.compile(r'chmod\s+(?:-\S+\s+)*([0-7]{3,4})\s+(/[^\s;|&]+)')
+SYSTEMCTL_RE = re.compile(r'systemctl\s+(?:--now\s+)?(disable|enable|mask)((?:[ \t]+[\w@.\-]+)+)')
+REGISTRY_RE = re.compile(r'(?:HKLM|HKEY_LOCAL_MACHINE)\\([\w\\ .\-]+?):(\w+)')
+REGISTRY_VALUE_RE = re.compile(r'(REG_DWORD|REG_SZ|REG_QWORD)\s+value\s+of\s+([^\s.]+(?:\.\d+)?)', re.IGNORECASE)
+WINDOWS_SERVICE_RE = re.compile(r"Ensure\s+'[^']*?\((\w+)\)'\s+is\s+set\s+to\s+'(Disabled|Automatic|Manual)'", re.IGNORECASE)
+
+REGISTRY_TYPES = {'REG_DWORD': 'DWord', 'REG_SZ': 'String', 'REG_QWORD': 'QWord'}
+
+# Command lines in policy text (CIS uses "# " as the root prompt); each must be consumed by a
+# pattern above, or be a read-only check of something already handled, for full confidence
+LINUX_COMMANDS = (
+    'chown', 'chmod', 'chgrp', 'setfacl', 'modprobe', 'rmmod', 'sysctl', 'systemctl', 'grep', 'egrep',
+    'sed', 'awk', 'echo', 'printf', 'tee', 'stat', 'ls', 'cat', 'find', 'rm', 'mv', 'cp', 'ln', 'touch',
+    'mkdir', 'mount', 'umount', 'apt', 'apt-get', 'yum', 'dnf', 'zypper', 'rpm', 'dpkg', 'useradd',
+    'usermod', 'userdel', 'groupadd', 'passwd', 'chage', 'auditctl', 'augenrules', 'crontab', 'ufw',
+    'firewall-cmd', 'nft', 'iptables', 'ip6tables', 'update-grub', 'grub2-mkconfig', 'update-crypto-policies'
+)
+WINDOWS_COMMANDS = (
+    'Set-ItemProperty', 'New-ItemProperty', 'Remove-ItemProperty', 'Set-Service', 'Stop-Service',
+    'Disable-WindowsOptionalFeature', 'Set-SmbServerConfiguration', 'Set-MpPreference', 'Set-NetFirewallProfile',
+    'auditpol', 'secedit', 'reg', 'net', 'sc', 'bcdedit', 'netsh'
+)
+LINUX_VERIFY_COMMANDS = {'grep', 'egrep', 'awk', 'stat', 'ls', 'cat', 'sysctl', 'systemctl'}
+SYSTEMCTL_VERIFY_RE = re.compile(r'\bsystemctl\s+(?:is-enabled|is-active|status|show)\b')
+COMMAND_PREFIX = r'(?:^[ \t]*(?:[#$>][ \t]*|\d+[.)][ \t]+|[-*\u2022][ \t]+)?|(?:&&|\|\||;)[ \t]*)(?:sudo[ \t]+)?'
+LINUX_COMMAND_RE = re.compile(
+    COMMAND_PREFIX + r'(' + '|'.join(map(re.escape, LINUX_COMMANDS)) + r')(?![\w-])([^\n;&|]*)', re.MULTILINE
+)
+WINDOWS_COMMAND_RE = re.compile(
+    COMMAND_PREFIX + r'(' + '|'.join(map(re.escape, WINDOWS_COMMANDS)) + r')(?![\w-])([^\n;&|]*)',
+    re.MULTILINE | re.IGNORECASE
+)
+
+
+def extract_policy_info(policy_text: str) -> Dict:
+    """Extract rule ID, level and title from policy text."""
+    id_match = re.search(r'(\d+\.\d+\.\d+)', policy_text)
+    level_match = re.search(r'\(L(\d+)\)', policy_text)
+    title_match = re.search(r'Ensure\s[\'"](.*?)[\'"]', policy_text)
+    
+    return {
+        'id': id_match.group(1) if id_match else None,
+        'level': int(level_match.group(1)) if level_match else None,
+        'title': title_match.group(1) if title_match else None
+    }
+
+
+def load_templates():
+    """Load script templates and function definitions for every platform."""
+    templates, functions = {}, {}
+    for os_key, platform_dir in PLATFORM_DIRS.items():
+        base = os.path.join(TEMPLATE_DIR, platform_dir)
+        templates[os_key] = {}
+        for script_type in ('audit', 'remediation', 'bundle'):
+            with open(os.path.join(base, f'{script_type}_template.txt'), 'r') as f:
+                templates[os_key][script_type] = f.read()
+        with open(os.path.join(base, 'functions.json'), 'r') as f:
+            functions[os_key] = json.load(f)
+    return templates, functions
+
+
+def flatten_functions(functions: Dict) -> Dict[str, str]:
+    """Map helper keys (check_sysctl, ...) to their source across all categories."""
+    return {key: code for category in functions.values() for key, code in category.items()}
+
+
+def render_script(template: str, functions: Dict, policy_info: Dict, script_type: str, result: Dict) -> str:
+    """Format a script template with an engine result, emitting only referenced helpers."""
+    if 'script' in result:
+        return result['script']
+    helpers = flatten_functions(functions)
+    body = '\n\n'.join([helpers[key] for key in result.get('helpers', []) if key in helpers] + [result['steps']])
+    return template.format(
+        rule_id=policy_info['id'],
+        description=policy_info['title'],
+        audit_steps=body if script_type == 'audit' else '',
+        remediation_steps=body if script_type == 'remediation' else ''
+    )
+
+
+class GenerationEngine:
+    """Base class for script generation engines.
+
+    ``generate`` receives a request dict (policy, policy_info, script_type,
+    os_key, remediation_steps, use_ai, document_id) and returns a dict with
+    ``steps`` and ``helpers`` (or a complete ``script``) plus a ``confidence``
+    between 0 and 1, or None when it cannot handle the request.
+    """
+
+    name = 'base'
+
+    def applies(self, request: Dict) -> bool:
+        return True
+
+    def generate(self, request: Dict) -> Optional[Dict]:
+        raise NotImplementedError
+
+
+class CallbackEngine(GenerationEngine):
+    """Adapts a function to the engine interface."""
+
+    def __init__(self, name: str, func: Callable[[Dict], Optional[Dict]], applies: Optional[Callable[[Dict], bool]] = None):
+        self.name = name
+        self.func = func
+        self.applies_func = applies
+
+    def applies(self, request: Dict) -> bool:
+        return self.applies_func(request) if self.applies_func else True
+
+    def generate(self, request: Dict) -> Optional[Dict]:
+        return self.func(request)
+
+
+class RuleEngine(GenerationEngine):
+    """Deterministic fast path for rules with recognisable settings.
+
+    Handles sysctl parameters, file permissions and services on Linux and
+    registry values and services on Windows, emitting calls to the helpers in
+    templates/*/functions.json.
+
+    Confidence reflects coverage: a command in the policy text that no
+    pattern consumed (chown, modprobe, symbolic chmod, ...) or a registry key
+    without its own value lowers it below the registry threshold, so the
+    request moves on to the next tier. If this result is still used, every
+    uncovered item is logged for manual review and fails the audit.
+    """
+
+    name = 'rules'
+
+    def generate(self, request: Dict) -> Optional[Dict]:
+        text = '\n'.join(filter(None, [request.get('policy'), request.get('remediation_steps')]))
+        remediate = request['script_type'] == 'remediation'
+        if request['os_key'] == 'windows':
+            checks, uncovered = self._windows_checks(text, remediate)
+            return self._result(checks, uncovered, windows=True)
+        checks, uncovered = self._linux_checks(text, remediate)
+        return self._result(checks, uncovered, windows=False)
+
+    def _linux_checks(self, text: str, remediate: bool) -> Tuple[List[tuple], List[str]]:
+        checks = []
+        consumed = []  # start offsets of pattern matches
+        targets = set()
+
+        sysctls = {}
+        for match in SYSCTL_RE.finditer(text):
+            sysctls[match.group(1)] = match.group(2)
+            consumed.append(match.start())
+        for match in SYSCTL_CONF_RE.finditer(text):
+            sysctls.setdefault(match.group(1), match.group(2))
+        for param, value in sysctls.items():
+            targets.add(param)
+            if WRITE_ONLY_SYSCTL_RE.search(param):
+                continue
+            if remediate:
+                checks.append(('set_sysctl', f'set_sysctl_value "{param}" "{value}"'))
+            checks.append(('check_sysctl', f'check_sysctl_value "{param}" "{value}"'))
+        if remediate:
+            # Flushes run once, after the values they apply have been set
+            checks.extend(('apply_sysctl', f'apply_sysctl_action "{param}" "{value}"')
+                          for param, value in sysctls.items() if WRITE_ONLY_SYSCTL_RE.search(param))
+
+        modes = {}
+        for match in CHMOD_RE.finditer(text):
+            modes[match.group(2)] = match.group(1)
+            consumed.append(match.start())
+        for path, mode in modes.items():
+            targets.add(path)
+            if remediate:
+                checks.append(('set_file_perms', f'set_file_permissions "{path}" "{mode}"'))
+            checks.append(('check_file', f'check_file_permissions "{path}" "{mode}"'))
+
+        services = {}
+        for match in SYSTEMCTL_RE.finditer(text):
+            action, units = match.groups()
+            consumed.append(match.start())
+            status = {'enable': 'enabled', 'disable': 'disabled', 'mask': 'masked'}[action]
+            # "systemctl --now mask a.socket a.service" names several units
+            for service in units.split():
+                if not service.startswith('-'):
+                    services[service] = status
+        for service, status in services.items():
+            targets.add(service)
+            if remediate:
+                checks.append(('set_service', f'set_service_status "{service}" "{status}"'))
+            checks.append(('check_service', f'check_service_status "{service}" "{status}"'))
+
+        uncovered = []
+        for match in LINUX_COMMAND_RE.finditer(text):
+            command, start, end = match.group(1), match.start(1), match.end(2)
+            line = text[start:end].strip()
+            if any(start <= offset < end for offset in consumed):
+                continue
+            # Audit commands that only read a setting handled above (sysctl x, stat path, grep param)
+            read_only = command in LINUX_VERIFY_COMMANDS and \
+                (command != 'systemctl' or SYSTEMCTL_VERIFY_RE.search(line)) and \
+                (command != 'sysctl' or ' -w' not in line)
+            if read_only and any(target in line for target in targets):
+                continue
+            uncovered.append(line)
+        return checks, list(dict.fromkeys(uncovered))
+
+    def _windows_checks(self, text: str, remediate: bool) -> Tuple[List[tuple], List[str]]:
+        checks = []
+        uncovered = []
+        consumed = []
+
+        keys = list(dict.fromkeys(REGISTRY_RE.findall(text)))
+        values = [(m.group(1).upper(), m.group(2)) for m in REGISTRY_VALUE_RE.finditer(text)]
+        consumed.extend(m.start() for m in REGISTRY_RE.finditer(text))
+        if len(keys) == 1 and values and len(set(values)) == 1:
+            pairs = [(keys[0], values[0])]
+        elif len(keys) > 1 and len(values) == len(keys):
+            # One value stated per key, in the same order as the keys
+            pairs = list(zip(keys, values))
+        else:
+            pairs = []
+            uncovered.extend(f"HKLM:\\{key_path.strip()}:{name}" for key_path, name in keys)
+
+        for (key_path, name), (reg_type, value) in pairs:
+            path = f"HKLM:\\{key_path.strip()}"
+            if remediate:
+                checks.append(('backup_registry', f"Backup-RegistryKey -Path '{path}' | Out-Null"))
+                checks.append(('set_registry', f"Set-RegistryValue -Path '{path}' -Name '{name}' "
+                                               f"-Value '{value}' -Type '{REGISTRY_TYPES[reg_type]}'"))
+            checks.append(('check_registry', f"Check-RegistryValue -Path '{path}' -Name '{name}' -ExpectedValue '{value}'"))
+        for service, status in WINDOWS_SERVICE_RE.findall(text):
+            status = status.capitalize()
+            if remediate:
+                checks.append(('set_service', f"Set-ServiceStatus -ServiceName '{service}' -Status '{status}'"))
+            checks.append(('check_service', f"Check-ServiceStatus -ServiceName '{service}' -ExpectedStatus '{status}'"))
+
+        for match in WINDOWS_COMMAND_RE.finditer(text):
+            start, end = match.start(1), match.end(2)
+            if not any(start <= offset < end for offset in consumed):
+                uncovered.append(text[start:end].strip())
+        return checks, list(dict.fromkeys(uncovered))
+
+    def _result(self, checks: List[tuple], uncovered: List[str], windows: bool) -> Optional[Dict]:
+        if not checks:
+            return None
+
+        helpers = list(dict.fromkeys(key for key, _ in checks))
+        lines = []
+        if windows:
+            lines.append('$failed = 0')
+            for key, call in checks:
+                if key.startswith('check_'):
+                    lines.append(f'if (-not ({call})) {{ $failed++ }}')
+                else:
+                    lines.append(call)
+            for item in uncovered:
+                message = ('Manual review required: ' + item).replace("'", "''")
+                lines.append(f"Write-Log '{message}'; $failed++")
+            lines.append(f'if ($failed -gt 0) {{ throw "$failed check(s) failed" }}')
+        else:
+            lines.append('failed=0')
+            for key, call in checks:
+                lines.append(f'{call} || failed=$((failed + 1))' if key.startswith('check_') else call)
+            for item in uncovered:
+                message = ('Manual review required: ' + item).replace("'", "'\\''")
+                lines.append(f"log '{message}'; failed=$((failed + 1))")
+            lines.append('if [ "$failed" -gt 0 ]; then\n    log "$failed check(s) failed"\n    exit 1\nfi')
+
+        # Full confidence only when every command and setting in the policy was handled
+        handled = sum(1 for key, _ in checks if key.startswith('check_'))
+        confidence = 1.0 if not uncovered else round(0.5 * handled / (handled + len(uncovered)), 2)
+        return {'steps': '\n'.join(lines), 'helpers': helpers, 'confidence': confidence, 'uncovered': uncovered}
+
+
+class MockEngine(GenerationEngine):
+    """Canned demonstration scripts used by app_simple.py."""
+
+    name = 'mock'
+
+    def generate(self, request: Dict) -> Optional[Dict]:
+        key = (request['os_key'], request['script_type'])
+        return {'script': MOCK_SCRIPTS[key], 'confidence': 0.5}
+
+
+class EngineRegistry:
+    """Tries engines in registration order and reports the share served by each.
+
+    The first result at or above ``min_confidence`` wins. If no engine is
+    confident enough, the most confident result is used.
+    """
+
+    def __init__(self, min_confidence: float = 0.8):
+        self.min_confidence = min_confidence
+        self.engines: List[GenerationEngine] = []
+        self._lock = threading.Lock()
+        self._served: Dict[str, int] = {}
+
+    def register(self, engine: GenerationEngine) -> None:
+        self.engines.append(engine)
+        self._served.setdefault(engine.name, 0)
+
+    def generate(self, request: Dict) -> Dict:
+        best = None
+        for engine in self.engines:
+            if not engine.applies(request):
+                continue
+            result = engine.generate(request)
+            if result is None:
+                continue
+            result['engine'] = engine.name
+            if result.get('confidence', 0) >= self.min_confidence:
+                best = result
+                break
+            if best is None or result.get('confidence', 0) > best.get('confidence', 0):
+                best = result
+
+        if best is None:
+            raise ValueError('No generation engine could handle the request')
+
+        with self._lock:
+            self._served[best['engine']] = self._served.get(best['engine'], 0) + 1
+        return best
+
+    def stats(self) -> Dict:
+        """Requests served per engine tier, with shares of the total."""
+        with self._lock:
+            served = dict(self._served)
+        total = sum(served.values())
+        return {
+            'total': total,
+            'min_confidence': self.min_confidence,
+            'engines': {
+                name: {'served': count, 'share': round(count / total, 4) if total else 0.0}
+                for name, count in served.items()
+            }
+        }
+
+
+MOCK_SCRIPTS = {
+    ('windows', 'audit'): '''# Windows Audit Script
+# Generated by ComplianceAI
+
+Write-Host "Starting compliance audit..."
+
+# Check password policy
+$passwordPolicy = Get-LocalSecurityPolicy | Where-Object { $_.Name -eq "PasswordPolicy" }
+Write-Host "Password policy check: $($passwordPolicy.Status)"
+
+# Check account lockout policy
+$lockoutPolicy = Get-LocalSecurityPolicy | Where-Object { $_.Name -eq "AccountLockoutPolicy" }
+Write-Host "Account lockout policy check: $($lockoutPolicy.Status)"
+
+Write-Host "Audit completed."''',
+    ('linux', 'audit'): '''#!/bin/bash
+# Linux Audit Script
+# Generated by ComplianceAI
+
+echo "Starting compliance audit..."
+
+# Check password policy
+if [ -f /etc/security/pwquality.conf ]; then
+    echo "Password policy file exists"
+    grep -E "minlen|minclass" /etc/security/pwquality.conf
+else
+    echo "Password policy file not found"
+fi
+
+# Check account lockout settings
+if [ -f /etc/security/faillock.conf ]; then
+    echo "Account lockout configuration exists"
+    grep -E "deny|unlock_time" /etc/security/faillock.conf
+else
+    echo "Account lockout configuration not found"
+fi
+
+echo "Audit completed."''',
+    ('windows', 'remediation'): '''# Windows Remediation Script
+# Generated by ComplianceAI
+# WARNING: This script modifies system settings
+
+Write-Host "Starting compliance remediation..."
+
+# Set password policy
+Write-Host "Configuring password policy..."
+secedit /configure /db $env:temp\\secpol.sdb /cfg $env:temp\\secpol.inf /quiet
+
+# Set account lockout policy
+Write-Host "Configuring account lockout policy..."
+net accounts /lockoutthreshold:5 /lockoutduration:30 /lockoutwindow:30
+
+Write-Host "Remediation completed."''',
+    ('linux', 'remediation'): '''#!/bin/bash
+# Linux Remediation Script
+# Generated by ComplianceAI
+# WARNING: This script modifies system settings
+
+echo "Starting compliance remediation..."
+
+# Configure password policy
+echo "Configuring password policy..."
+if [ -f /etc/security/pwquality.conf ]; then
+    cp /etc/security/pwquality.conf /etc/security/pwquality.conf.backup
+    echo "minlen = 12" >> /etc/security/pwquality.conf
+    echo "minclass = 3" >> /etc/security/pwquality.conf
+fi
+
+# Configure account lockout
+echo "Configuring account lockout..."
+if [ -f /etc/security/faillock.conf ]; then
+    cp /etc/security/faillock.conf /etc/security/faillock.conf.backup
+    echo "deny = 5" >> /etc/security/faillock.conf
+    echo "unlock_time = 1800" >> /etc/security/faillock.conf
+fi
+
+echo "Remediation completed."'''
+}
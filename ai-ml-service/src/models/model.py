@@ -1,9 +1,14 @@
 from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
 from langchain import LLMChain, PromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.callbacks import get_openai_callback
+from src.models.local_llm import build_local_llm
+from src.models.token_usage import TokenUsageTracker, UsageCallbackHandler
+from src.models.bundles import build_bundle
+from src.models.engines import (
+    CallbackEngine, EngineRegistry, RuleEngine, extract_policy_info, load_templates, render_script
+)
+from src.services.text_normalizer import TextNormalizer, estimate_tokens, CHARS_PER_TOKEN
 import torch
-import json
 import os
 import re
 from typing import Dict, List, Tuple, Optional
@@ -12,8 +17,23 @@ class ComplianceAI:
     def __init__(self):
         self.tokenizer = None
         self.model = None
-        # Initialize Gemini model with optimized settings
-        self.llm = ChatGoogleGenerativeAI(
+        # LLM_PROVIDER=local swaps Gemini for an offline stand-in (dev/load testing)
+        self.llm_provider = os.getenv('LLM_PROVIDER', 'gemini').lower()
+        if self.llm_provider == 'local':
+            self.llm = build_local_llm()
+        else:
+            self.llm = self._build_gemini_llm()
+        self.templates: Dict[str, Dict] = {}
+        self.functions: Dict[str, Dict] = {}
+        # Token accounting and budgets (0 disables a budget)
+        self.token_usage = TokenUsageTracker()
+        self.max_prompt_tokens = int(os.getenv('LLM_MAX_PROMPT_TOKENS', '30000'))
+        self.max_document_tokens = int(os.getenv('LLM_MAX_DOCUMENT_TOKENS', '200000'))
+        self.engines = self._build_engine_registry()
+
+    def _build_gemini_llm(self):
+        """Initialize Gemini model with optimized settings"""
+        return ChatGoogleGenerativeAI(
             model="gemini-pro",
             temperature=0.3,  # Lower temperature for more deterministic outputs
             top_p=0.9,       # Nucleus sampling for better code generation
@@ -26,15 +46,14 @@ class ComplianceAI:
                 "DANGEROUS_CONTENT": "block_none"
             }
         )
-        self.templates: Dict[str, Dict] = {}
-        self.functions: Dict[str, Dict] = {}
         
     def setup_models(self):
         """Initialize the transformer models and load templates"""
-        # Set up AI models
-        model_name = "microsoft/codebert-base"
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        # Set up AI models (skipped for the offline stand-in)
+        if self.llm_provider != 'local':
+            model_name = "microsoft/codebert-base"
+            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+            self.model = AutoModelForSequenceClassification.from_pretrained(model_name)
         
         # Load templates
         self._load_templates()
@@ -42,35 +61,72 @@ class ComplianceAI:
     def _load_templates(self):
         """Load script templates and function definitions."""
         try:
-            # Load Windows templates
-            self.templates['windows'] = {
-                'audit': self._load_template('windows/powershell/audit_template.txt'),
-                'remediation': self._load_template('windows/powershell/remediation_template.txt')
-            }
-            self.functions['windows'] = self._load_json('windows/powershell/functions.json')
-            
-            # Load Linux templates
-            self.templates['linux'] = {
-                'audit': self._load_template('linux/bash/audit_template.txt'),
-                'remediation': self._load_template('linux/bash/remediation_template.txt')
-            }
-            self.functions['linux'] = self._load_json('linux/bash/functions.json')
+            self.templates, self.functions = load_templates()
         except Exception as e:
             print(f"Warning: Failed to load templates: {e}")
+    
+    def _run_chain(self,
+                   prompt: PromptTemplate,
+                   inputs: Dict,
+                   endpoint: str,
+                   document_id: Optional[str] = None,
+                   rule_id: Optional[str] = None,
+                   compacted: bool = False) -> Optional[str]:
+        """Run an LLM chain with token accounting; returns None when a budget blocks the call."""
+        estimated = estimate_tokens(prompt.format(**inputs))
+        if self.max_prompt_tokens and estimated > self.max_prompt_tokens:
+            self.token_usage.record_fallback(endpoint, document_id, rule_id)
+            return None
+        
+        # Reserve before calling so concurrent requests for one document cannot all pass the check
+        reserved = 0
+        if document_id and self.max_document_tokens:
+            if not self.token_usage.reserve(document_id, estimated, self.max_document_tokens):
+                self.token_usage.record_fallback(endpoint, document_id, rule_id)
+                return None
+            reserved = estimated
+        
+        handler = UsageCallbackHandler()
+        chain = LLMChain(llm=self.llm, prompt=prompt)
+        try:
+            output = chain.run(callbacks=[handler], **inputs)
+        except Exception:
+            self.token_usage.release(document_id, reserved)
+            raise
+        
+        # Providers that report no usage are accounted with estimates
+        self.token_usage.record(
+            endpoint,
+            estimated_prompt_tokens=estimated,
+            prompt_tokens=handler.prompt_tokens or estimated,
+            completion_tokens=handler.completion_tokens or estimate_tokens(output),
+            document_id=document_id,
+            rule_id=rule_id,
+            compacted=compacted,
+            reserved=reserved
+        )
+        return output
 
-    def _load_template(self, path: str) -> str:
-        """Load a template file from the templates directory."""
-        template_dir = os.path.join(os.path.dirname(__file__), '..', 'templates')
-        with open(os.path.join(template_dir, path), 'r') as f:
-            return f.read()
+    def _compact_text(self, text: str, max_tokens: int) -> Tuple[str, int]:
+        """Shrink document text to fit a prompt token budget; returns the text and characters dropped."""
+        text = TextNormalizer().normalize_text(text)
+        max_chars = max(0, max_tokens) * CHARS_PER_TOKEN
+        if len(text) <= max_chars:
+            return text, 0
+        cut = text.rfind('\n', 0, max_chars)
+        kept = text[:cut if cut > 0 else max_chars]
+        return kept, len(text) - len(kept)
 
-    def _load_json(self, path: str) -> Dict:
-        """Load a JSON file from the templates directory."""
-        template_dir = os.path.join(os.path.dirname(__file__), '..', 'templates')
-        with open(os.path.join(template_dir, path), 'r') as f:
-            return json.load(f)
+    def get_token_usage(self) -> Dict:
+        """Token totals and budgets for capacity planning."""
+        usage = self.token_usage.snapshot()
+        usage['budgets'] = {
+            'max_prompt_tokens': self.max_prompt_tokens,
+            'max_document_tokens': self.max_document_tokens
+        }
+        return usage
     
-    def analyze_compliance_doc(self, text):
+    def analyze_compliance_doc(self, text, document_id: Optional[str] = None):
         """Analyze compliance document text and extract relevant information"""
         # Gemini-optimized prompt template with explicit structure
         template = """
@@ -97,108 +153,207 @@ class ComplianceAI:
         """
         
         prompt = PromptTemplate(template=template, input_variables=["text"])
-        chain = LLMChain(llm=self.llm, prompt=prompt)
+        
+        # Compact oversized documents instead of sending huge prompts
+        compacted = False
+        dropped_chars = 0
+        if self.max_prompt_tokens and estimate_tokens(prompt.format(text=text)) > self.max_prompt_tokens:
+            overhead = estimate_tokens(prompt.format(text=''))
+            text, dropped_chars = self._compact_text(text, self.max_prompt_tokens - overhead)
+            compacted = True
         
         # Get AI analysis
-        analysis = chain.run(text=text)
+        analysis = self._run_chain(prompt, {'text': text}, 'analyze_document',
+                                   document_id=document_id, compacted=compacted)
         
         # Extract structured info using regex
         policy_info = self.analyze_policy(text)
         
+        # Compaction keeps the head of the document; say what was left out
+        note = ""
+        if dropped_chars:
+            note = (f"\n\nCompacted: {dropped_chars} characters at the end of the document were dropped "
+                    f"to fit the prompt budget; rules after the cut were not analyzed")
+        
+        # Fall back to rule-based extraction when over budget
+        if analysis is None:
+            return "Extracted Policy Info:\n" + str(policy_info) + note
+        
         # Combine AI analysis with structured extraction
-        result = analysis + "\n\nExtracted Policy Info:\n" + str(policy_info)
+        result = analysis + "\n\nExtracted Policy Info:\n" + str(policy_info) + note
         return result
 
+    def parse_policies(self, text: str) -> List[str]:
+        """Split document text into one chunk per benchmark rule."""
+        heading = re.compile(r'^\d+(?:\.\d+)+\s+(?:\(L\d\)\s+)?Ensure\b.*$', re.MULTILINE)
+        matches = list(heading.finditer(text))
+        
+        policies: Dict[str, str] = {}
+        for i, match in enumerate(matches):
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+            chunk = text[match.start():end].strip()
+            rule_id = match.group(0).split()[0]
+            # Table of contents entries repeat the heading; keep the full rule body
+            if len(chunk) > len(policies.get(rule_id, '')):
+                policies[rule_id] = chunk
+        
+        return list(policies.values())
+
     def analyze_policy(self, policy_text: str) -> Dict:
         """Analyze a policy and extract key information."""
-        # Extract policy ID, title, and level
-        id_match = re.search(r'(\d+\.\d+\.\d+)', policy_text)
-        level_match = re.search(r'\(L(\d+)\)', policy_text)
-        title_match = re.search(r'Ensure\s[\'"](.*?)[\'"]', policy_text)
-        
-        return {
-            'id': id_match.group(1) if id_match else None,
-            'level': int(level_match.group(1)) if level_match else None,
-            'title': title_match.group(1) if title_match else None
-        }
+        return extract_policy_info(policy_text)
+
+    def _build_engine_registry(self) -> EngineRegistry:
+        """Generation tiers: deterministic rules, then the LLM, then instruction templates."""
+        registry = EngineRegistry(min_confidence=float(os.getenv('FAST_PATH_MIN_CONFIDENCE', '0.8')))
+        registry.register(RuleEngine())
+        registry.register(CallbackEngine('llm', self._generate_ai_steps, applies=lambda request: request['use_ai']))
+        registry.register(CallbackEngine('template', self._generate_template_steps))
+        return registry
+
+    def get_engine_stats(self) -> Dict:
+        """Share of script requests served by each generation tier."""
+        return self.engines.stats()
 
     def generate_script(self, 
                        policy: str, 
                        audit_remediation: str, 
                        os_type: str, 
                        use_ai: bool = True,
-                       remediation_steps: Optional[str] = None) -> str:
+                       remediation_steps: Optional[str] = None,
+                       document_id: Optional[str] = None) -> str:
         """Generate a script based on the policy, audit/remediation choice, and OS type."""
+        return self.generate_script_result(
+            policy, audit_remediation, os_type, use_ai, remediation_steps, document_id
+        )['script']
+
+    def generate_script_result(self,
+                               policy: str,
+                               audit_remediation: str,
+                               os_type: str,
+                               use_ai: bool = True,
+                               remediation_steps: Optional[str] = None,
+                               document_id: Optional[str] = None) -> Dict:
+        """Generate a script and report which engine tier produced it."""
         os_key = 'windows' if os_type.lower() == 'windows' else 'linux'
+        script_type = audit_remediation.lower()
         policy_info = self.analyze_policy(policy)
         
-        if use_ai:
-            # Gemini-optimized template for script generation
-            ai_template = """
-            You are generating a {script_type} script for {platform}. 
-            Follow these exact requirements:
+        result = self._engine_result(policy, policy_info, script_type, os_type, use_ai,
+                                     remediation_steps, document_id)
+        
+        script = render_script(self.templates[os_key][script_type], self.functions[os_key],
+                               policy_info, script_type, result)
+        return {'script': script, 'engine': result['engine'], 'confidence': result['confidence']}
 
-            Rule Details:
-            - ID: {rule_id}
-            - Title: {title}
-            - Level: {level}
+    def generate_bundle(self,
+                        policies: List[str],
+                        audit_remediation: str,
+                        os_type: str,
+                        use_ai: bool = True,
+                        document_id: Optional[str] = None,
+                        max_parallel: int = 4,
+                        check_timeout: int = 300) -> Dict:
+        """Generate one script per platform covering many rules with a shared helper library.
+        
+        Audit bundles run up to max_parallel rules concurrently, each limited to check_timeout seconds.
+        """
+        os_key = 'windows' if os_type.lower() == 'windows' else 'linux'
+        script_type = audit_remediation.lower()
+        return build_bundle(
+            policies,
+            lambda policy, policy_info: self._engine_result(policy, policy_info, script_type, os_type,
+                                                            use_ai, None, document_id),
+            self.templates[os_key]['bundle'], self.functions[os_key],
+            os_key, script_type, max_parallel, check_timeout
+        )
 
-            Requirements:
-            1. Use native {platform} commands only
-            2. Include proper error handling for each step
-            3. Add detailed logging with timestamps
-            4. Implement input validation
-            5. Follow security best practices
-            6. Add comments explaining complex operations
-            7. Include backup/restore functionality
-            8. Add status checks after each critical operation
+    def _engine_result(self,
+                       policy: str,
+                       policy_info: Dict,
+                       script_type: str,
+                       os_type: str,
+                       use_ai: bool,
+                       remediation_steps: Optional[str],
+                       document_id: Optional[str]) -> Dict:
+        """Run the engine tiers for one rule."""
+        return self.engines.generate({
+            'policy': policy,
+            'policy_info': policy_info,
+            'script_type': script_type,
+            'os_type': os_type,
+            'os_key': 'windows' if os_type.lower() == 'windows' else 'linux',
+            'remediation_steps': remediation_steps,
+            'use_ai': use_ai,
+            'document_id': document_id
+        })
 
-            Generate only the script content, no explanations.
-            Use {platform}-specific commands and best practices.
-            """
-            
-            prompt = PromptTemplate(
-                template=ai_template,
-                input_variables=["script_type", "platform", "rule_id", "title", "level"]
-            )
-            
-            chain = LLMChain(llm=self.llm, prompt=prompt)
-            ai_script = chain.run(
-                script_type=audit_remediation,
-                platform=os_type,
-                rule_id=policy_info['id'],
-                title=policy_info['title'],
-                level=policy_info['level']
-            )
-            
-            # Get template and format it with AI-generated steps
-            template = self.templates[os_key][audit_remediation.lower()]
-            script = template.format(
-                rule_id=policy_info['id'],
-                description=policy_info['title'],
-                audit_steps=ai_script if audit_remediation.lower() == 'audit' else '',
-                remediation_steps=ai_script if audit_remediation.lower() == 'remediation' else ''
-            )
-        else:
-            # Use template-based generation
-            template = self.templates[os_key][audit_remediation.lower()]
-            functions = self.functions[os_key]
-            
-            # Generate script steps based on remediation instructions or policy
-            if remediation_steps:
-                steps = self._generate_steps_from_instructions(remediation_steps, os_key, functions)
-            else:
-                steps = self._generate_steps_from_policy(policy_info, os_key, functions)
-            
-            # Format template
-            script = template.format(
-                rule_id=policy_info['id'],
-                description=policy_info['title'],
-                audit_steps=steps if audit_remediation.lower() == 'audit' else '',
-                remediation_steps=steps if audit_remediation.lower() == 'remediation' else ''
-            )
+    def _generate_ai_steps(self, request: Dict) -> Optional[Dict]:
+        """LLM tier; returns None when a token budget blocks the call."""
+        policy_info = request['policy_info']
         
-        return script
+        # Gemini-optimized template for script generation
+        ai_template = """
+        You are generating a {script_type} script for {platform}. 
+        Follow these exact requirements:
+
+        Rule Details:
+        - ID: {rule_id}
+        - Title: {title}
+        - Level: {level}
+
+        Requirements:
+        1. Use native {platform} commands only
+        2. Include proper error handling for each step
+        3. Add detailed logging with timestamps
+        4. Implement input validation
+        5. Follow security best practices
+        6. Add comments explaining complex operations
+        7. Include backup/restore functionality
+        8. Add status checks after each critical operation
+
+        Generate only the script content, no explanations.
+        Use {platform}-specific commands and best practices.
+        """
+        
+        prompt = PromptTemplate(
+            template=ai_template,
+            input_variables=["script_type", "platform", "rule_id", "title", "level"]
+        )
+        
+        inputs = {
+            'script_type': request['script_type'],
+            'platform': request['os_type'],
+            'rule_id': policy_info['id'],
+            'title': policy_info['title'],
+            'level': policy_info['level']
+        }
+        ai_script = self._run_chain(prompt, inputs, 'generate_script',
+                                    document_id=request['document_id'], rule_id=policy_info['id'])
+        if ai_script is None:
+            return None
+        return {'steps': ai_script, 'helpers': [], 'confidence': 0.9}
+
+    def _generate_template_steps(self, request: Dict) -> Dict:
+        """Template tier used when neither the fast path nor the LLM applies."""
+        os_key = request['os_key']
+        functions = self.functions[os_key]
+        
+        # Generate script steps based on remediation instructions or policy
+        if request['remediation_steps']:
+            steps = self._generate_steps_from_instructions(request['remediation_steps'], os_key, functions)
+            confidence = 0.5
+        else:
+            steps = self._generate_steps_from_policy(request['policy_info'], os_key, functions)
+            confidence = 0.1
+        return {'steps': steps, 'helpers': [], 'confidence': confidence}
+
+    def _generate_steps_from_policy(self, policy_info: Dict, os_type: str, functions: Dict) -> str:
+        """Generate placeholder steps when no remediation instructions are available."""
+        message = f"Manual review required for rule {policy_info['id']}: {policy_info['title']}"
+        if os_type == 'windows':
+            return f"Write-Log \"{message}\""
+        return f'log "{message}"'
 
     def _generate_steps_from_instructions(self, 
                                         instructions: str, 
@@ -0,0 +1,139 @@
+from langchain.callbacks.base import BaseCallbackHandler
+from collections import defaultdict
+from typing import Any, Dict, Optional, Tuple
+import threading
+
+
+def _empty_bucket() -> Dict[str, int]:
+    return {
+        'calls': 0,
+        'estimated_prompt_tokens': 0,
+        'prompt_tokens': 0,
+        'completion_tokens': 0,
+        'total_tokens': 0,
+        'compacted': 0,
+        'fallbacks': 0
+    }
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """Collects token usage reported by the LLM provider for one chain run.
+
+    Handles OpenAI style ``token_usage``, Gemini ``usage_metadata`` and
+    message level ``usage_metadata``. Counts stay at zero when the provider
+    reports nothing, so callers fall back to estimates.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        prompt, completion = self._extract_usage(response)
+        self.prompt_tokens += prompt
+        self.completion_tokens += completion
+
+    def _extract_usage(self, response: Any) -> Tuple[int, int]:
+        llm_output = getattr(response, 'llm_output', None) or {}
+        usage = llm_output.get('token_usage') or llm_output.get('usage_metadata')
+        if usage:
+            return self._read_counts(usage)
+
+        prompt = completion = 0
+        for generations in getattr(response, 'generations', None) or []:
+            for generation in generations:
+                message = getattr(generation, 'message', None)
+                usage = getattr(message, 'usage_metadata', None) \
+                    or (getattr(generation, 'generation_info', None) or {}).get('usage_metadata')
+                if usage:
+                    p, c = self._read_counts(usage)
+                    prompt += p
+                    completion += c
+        return prompt, completion
+
+    def _read_counts(self, usage: Dict) -> Tuple[int, int]:
+        prompt = usage.get('prompt_tokens') or usage.get('input_tokens') or usage.get('prompt_token_count') or 0
+        completion = usage.get('completion_tokens') or usage.get('output_tokens') \
+            or usage.get('candidates_token_count') or 0
+        return int(prompt), int(completion)
+
+
+class TokenUsageTracker:
+    """Thread-safe token totals broken down by endpoint, document and rule."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.totals = _empty_bucket()
+        self.by_endpoint: Dict[str, Dict[str, int]] = defaultdict(_empty_bucket)
+        self.by_document: Dict[str, Dict[str, int]] = defaultdict(_empty_bucket)
+        self.by_rule: Dict[str, Dict[str, int]] = defaultdict(_empty_bucket)
+        # Estimated tokens of in-flight calls, claimed against document budgets
+        self.reserved: Dict[str, int] = defaultdict(int)
+
+    def _buckets(self, endpoint: str, document_id: Optional[str], rule_id: Optional[str]):
+        buckets = [self.totals, self.by_endpoint[endpoint]]
+        if document_id:
+            buckets.append(self.by_document[document_id])
+        if rule_id:
+            buckets.append(self.by_rule[rule_id])
+        return buckets
+
+    def record(self,
+               endpoint: str,
+               estimated_prompt_tokens: int,
+               prompt_tokens: int,
+               completion_tokens: int,
+               document_id: Optional[str] = None,
+               rule_id: Optional[str] = None,
+               compacted: bool = False,
+               reserved: int = 0) -> None:
+        """Record one LLM call, settling any reservation made for it."""
+        with self._lock:
+            self._release(document_id, reserved)
+            for bucket in self._buckets(endpoint, document_id, rule_id):
+                bucket['calls'] += 1
+                bucket['estimated_prompt_tokens'] += estimated_prompt_tokens
+                bucket['prompt_tokens'] += prompt_tokens
+                bucket['completion_tokens'] += completion_tokens
+                bucket['total_tokens'] += prompt_tokens + completion_tokens
+                bucket['compacted'] += int(compacted)
+
+    def record_fallback(self, endpoint: str, document_id: Optional[str] = None, rule_id: Optional[str] = None) -> None:
+        """Record a request served without the LLM because of a budget."""
+        with self._lock:
+            for bucket in self._buckets(endpoint, document_id, rule_id):
+                bucket['fallbacks'] += 1
+
+    def reserve(self, document_id: str, tokens: int, limit: int) -> bool:
+        """Claim tokens against a document budget before a call; False if the budget would be exceeded."""
+        with self._lock:
+            bucket = self.by_document.get(document_id)
+            spent = (bucket['total_tokens'] if bucket else 0) + self.reserved.get(document_id, 0)
+            if spent + tokens > limit:
+                return False
+            self.reserved[document_id] += tokens
+            return True
+
+    def release(self, document_id: Optional[str], tokens: int) -> None:
+        """Return a reservation for a call that did not complete."""
+        with self._lock:
+            self._release(document_id, tokens)
+
+    def _release(self, document_id: Optional[str], tokens: int) -> None:
+        if not document_id or not tokens or document_id not in self.reserved:
+            return
+        self.reserved[document_id] -= tokens
+        if self.reserved[document_id] <= 0:
+            del self.reserved[document_id]
+
+    def snapshot(self) -> Dict:
+        """Copy of all totals for reporting."""
+        with self._lock:
+            return {
+                'totals': dict(self.totals),
+                'by_endpoint': {k: dict(v) for k, v in self.by_endpoint.items()},
+                'by_document': {k: dict(v) for k, v in self.by_document.items()},
+                'by_rule': {k: dict(v) for k, v in self.by_rule.items()},
+                'reserved': dict(self.reserved)
+            }
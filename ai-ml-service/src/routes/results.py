@@ -0,0 +1,55 @@
+from flask import Blueprint, request, jsonify
+
+
+def create_results_blueprint(aggregator):
+    """
+    Audit result ingestion and summary routes, shared by app.py and app_simple.py
+
+    Args:
+        aggregator (ResultsAggregator): Store the routes ingest into and query
+
+    Returns:
+        Blueprint: Routes under /results
+    """
+    results = Blueprint('results', __name__)
+
+    @results.route('/results', methods=['POST'])
+    def ingest_results():
+        """Ingest audit results streamed from a host (NDJSON or template log lines, optionally gzip)"""
+        # An explicit host applies to every line; otherwise records name their own host
+        host = request.headers.get('X-Host-ID') or request.args.get('host')
+        compressed = request.headers.get('Content-Encoding', '').lower() == 'gzip' \
+            or request.mimetype in ('application/gzip', 'application/x-gzip')
+
+        try:
+            return jsonify(aggregator.ingest(request.stream, host, compressed,
+                                             default_host=request.remote_addr or 'unknown'))
+
+        except (OSError, EOFError) as e:
+            # Corrupt or truncated gzip body; lines parsed before the damage are kept
+            return jsonify({'error': f'Invalid upload: {e}'}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @results.route('/results', methods=['GET'])
+    def results_summary():
+        """Fleet-wide pass/fail totals and the rules failing on the most hosts"""
+        return jsonify(aggregator.summary(top=request.args.get('top', 10, type=int)))
+
+    @results.route('/results/rules/<path:rule_id>', methods=['GET'])
+    def rule_results(rule_id):
+        """Pass/fail counts for one rule and the hosts not passing it"""
+        summary = aggregator.rule_summary(rule_id, limit=request.args.get('limit', 100, type=int))
+        if summary is None:
+            return jsonify({'error': 'No results for rule'}), 404
+        return jsonify(summary)
+
+    @results.route('/results/hosts/<host>', methods=['GET'])
+    def host_results(host):
+        """Pass/fail counts for one host and the rules it is not passing"""
+        summary = aggregator.host_summary(host)
+        if summary is None:
+            return jsonify({'error': 'No results for host'}), 404
+        return jsonify(summary)
+
+    return results
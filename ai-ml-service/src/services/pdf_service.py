@@ -1,5 +1,11 @@
 import fitz  # PyMuPDF
 import logging
+import re
+from collections import Counter
+
+RECOMMENDATIONS_RE = re.compile(r'^\s*recommendations\s*$', re.IGNORECASE)
+NUMBERED_SECTION_RE = re.compile(r'^\s*\d+(\.\d+)*\s+\S')
+BACK_MATTER_RE = re.compile(r'^\s*(appendix|summary table|change history|checklist)', re.IGNORECASE)
 
 class PDFService:
     """Service for handling PDF document processing"""
@@ -18,26 +24,200 @@ class PDFService:
         Returns:
             str: Extracted text content
         """
+        return "".join(self.extract_pages_from_pdf(pdf_path))
+    
+    def extract_pages_from_pdf(self, pdf_path, page_ranges=None):
+        """
+        Extract text content from PDF file, one entry per page
+        
+        Args:
+            pdf_path (str): Path to the PDF file
+            page_ranges (list): Optional 1-based inclusive (start, end) ranges to extract
+            
+        Returns:
+            list: Extracted text of each page
+        """
         try:
             doc = fitz.open(pdf_path)
-            text = ""
+            page_numbers = self._range_pages(page_ranges, len(doc)) if page_ranges else range(len(doc))
+            pages = []
             
-            for page_num in range(len(doc)):
+            for page_num in page_numbers:
                 page = doc.load_page(page_num)
-                text += page.get_text()
+                pages.append(page.get_text())
             
             doc.close()
             
-            if not text.strip():
+            total_chars = sum(len(page) for page in pages)
+            if not any(page.strip() for page in pages):
                 raise Exception("No text content found in PDF")
                 
-            self.logger.info(f"Successfully extracted {len(text)} characters from PDF")
-            return text
+            self.logger.info(f"Successfully extracted {total_chars} characters from {len(pages)} PDF pages")
+            return pages
             
         except Exception as e:
             self.logger.error(f"Error extracting text from PDF: {str(e)}")
             raise Exception(f"Failed to extract text from PDF: {str(e)}")
     
+    def extract_rule_pages(self, pdf_path, page_ranges=None):
+        """
+        Extract only the pages holding benchmark rules, skipping front matter and appendices
+        
+        Rule sections are located from the document outline (get_toc) when it has
+        one, otherwise from heading spans in the page layout. Explicit page ranges
+        take precedence over both.
+        
+        Args:
+            pdf_path (str): Path to the PDF file
+            page_ranges (list or str): Optional 1-based inclusive ranges, e.g. [(12, 240)] or "12-240,250"
+            
+        Returns:
+            tuple: (list of page texts, extraction report with pages skipped)
+        """
+        try:
+            doc = fitz.open(pdf_path)
+            page_count = len(doc)
+            
+            if page_ranges:
+                ranges, mode = self.parse_page_ranges(page_ranges, page_count), 'explicit'
+            else:
+                ranges, mode = self._toc_rule_ranges(doc.get_toc(), page_count), 'toc'
+                if not ranges:
+                    ranges, mode = self._layout_rule_ranges(doc), 'layout'
+                if not ranges:
+                    ranges, mode = [(1, page_count)], 'full'
+            doc.close()
+            
+            pages = self.extract_pages_from_pdf(pdf_path, ranges)
+            report = {
+                'mode': mode,
+                'page_count': page_count,
+                'pages_extracted': len(pages),
+                'pages_skipped': page_count - len(pages),
+                'ranges': [list(r) for r in ranges]
+            }
+            self.logger.info(
+                f"Selective extraction ({mode}): {report['pages_extracted']} of {page_count} pages, "
+                f"{report['pages_skipped']} skipped"
+            )
+            return pages, report
+            
+        except ValueError:
+            # Page ranges outside the document are a client error, not an extraction failure
+            raise
+        except Exception as e:
+            self.logger.error(f"Error extracting rule pages from PDF: {str(e)}")
+            raise Exception(f"Failed to extract text from PDF: {str(e)}")
+    
+    def parse_page_spec(self, spec):
+        """
+        Parse a page range string such as "1-5,9,12-20" or "12-"
+        
+        Args:
+            spec (str): Comma separated pages or inclusive ranges, 1-based; a range
+                without an end ("12-") runs to the last page
+            
+        Returns:
+            list: (start, end) tuples in the order given; end is None for open-ended ranges
+            
+        Raises:
+            ValueError: If the string is empty or malformed
+        """
+        parsed = []
+        for part in filter(None, (p.strip() for p in spec.split(','))):
+            start, dash, end = (s.strip() for s in part.partition('-'))
+            if not start.isdigit() or (end and not end.isdigit()):
+                raise ValueError(f"Invalid page range '{part}', expected e.g. 1-5,9,12-")
+            start = int(start)
+            end = int(end) if end else None if dash else start
+            if start < 1 or (end is not None and end < start):
+                raise ValueError(f"Invalid page range '{part}', expected e.g. 1-5,9,12-")
+            parsed.append((start, end))
+        if not parsed:
+            raise ValueError("No page ranges given")
+        return parsed
+    
+    def parse_page_ranges(self, page_ranges, page_count):
+        """
+        Normalize page ranges to sorted, merged, clamped 1-based (start, end) tuples
+        
+        Args:
+            page_ranges (list or str): [(start, end), ...] or "1-5,9,12-20"; an end of
+                None runs to the last page
+            page_count (int): Number of pages in the document
+            
+        Returns:
+            list: Merged (start, end) tuples
+        """
+        if isinstance(page_ranges, str):
+            page_ranges = self.parse_page_spec(page_ranges)
+        
+        merged = []
+        clamped = ((max(1, int(s)), page_count if e is None else min(page_count, int(e))) for s, e in page_ranges)
+        for start, end in sorted(clamped):
+            if start > end:
+                continue
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        if not merged:
+            raise ValueError(f"No pages selected from a {page_count}-page document")
+        return merged
+    
+    def _range_pages(self, page_ranges, page_count):
+        """0-based page numbers covered by 1-based inclusive ranges"""
+        return [n - 1 for start, end in self.parse_page_ranges(page_ranges, page_count) for n in range(start, end + 1)]
+    
+    def _toc_rule_ranges(self, toc, page_count):
+        """Locate the rule section from the outline: the 'Recommendations' chapter,
+        or else the span of numbered sections up to the first appendix"""
+        for i, (level, title, page) in enumerate(toc):
+            if RECOMMENDATIONS_RE.match(title) and page > 0:
+                end = next((p - 1 for lvl, _, p in toc[i + 1:] if lvl <= level and p > 0), page_count)
+                return [(page, max(page, end))]
+        
+        numbered = [i for i, (_, title, page) in enumerate(toc) if NUMBERED_SECTION_RE.match(title) and page > 0]
+        if not numbered:
+            return []
+        start = toc[numbered[0]][2]
+        end = next((p - 1 for _, title, p in toc[numbered[0] + 1:]
+                    if BACK_MATTER_RE.match(title) and p > start), page_count)
+        return [(start, end)]
+    
+    def _page_headings(self, page):
+        """Text of lines set in a larger font than the page body"""
+        lines = []
+        sizes = Counter()
+        for block in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]:
+            for line in block.get("lines", []):
+                spans = [span for span in line["spans"] if span["text"].strip()]
+                if not spans:
+                    continue
+                size = round(max(span["size"] for span in spans), 1)
+                text = "".join(span["text"] for span in spans).strip()
+                sizes[size] += len(text)
+                lines.append((size, text))
+        if not sizes:
+            return []
+        body_size = sizes.most_common(1)[0][0]
+        return [text for size, text in lines if size >= body_size * 1.15]
+    
+    def _layout_rule_ranges(self, doc):
+        """Locate the rule section from heading spans when the PDF has no outline"""
+        start = end = None
+        for page_num in range(len(doc)):
+            headings = self._page_headings(doc.load_page(page_num))
+            if start is None:
+                if any(RECOMMENDATIONS_RE.match(h) or NUMBERED_SECTION_RE.match(h) for h in headings):
+                    start = page_num + 1
+            elif any(BACK_MATTER_RE.match(h) for h in headings):
+                end = page_num
+                break
+        if start is None:
+            return []
+        return [(start, end or len(doc))]
+    
     def validate_pdf_structure(self, pdf_path):
         """
         Validate PDF structure and extract metadata
@@ -0,0 +1,310 @@
+from array import array
+import gzip
+import json
+import logging
+import re
+import threading
+import time
+
+STATUSES = ('pass', 'fail', 'timeout', 'error')
+_STATUS_CODES = {name: code for code, name in enumerate(STATUSES, start=1)}
+_PASS = _STATUS_CODES['pass']
+_FAIL = _STATUS_CODES['fail']
+_ERROR = _STATUS_CODES['error']
+_SLOTS = len(STATUSES)
+
+# Log lines written by the templates look like "<timestamp>: <message>"
+BUNDLE_RESULT_RE = re.compile(rb': \[([^\]\s]+)\] Finished: (\w+)')
+BUNDLE_START_RE = re.compile(rb': \[[^\]\s]+\] Starting (audit|remediation)\s*$')
+BUNDLE_DONE_RE = re.compile(rb': (Audit|Remediation) bundle completed')
+RULE_START_RE = re.compile(rb': Starting (audit|remediation) for Rule (\S+)')
+MAX_RULE_ID_LENGTH = 128
+
+# Decoding str directly skips json.loads' per-call encoding detection
+_decode_json = json.JSONDecoder().decode
+
+
+class ResultsAggregator:
+    """Pass/fail aggregates of audit results reported by many hosts
+
+    Uploads are read line by line, so whole files are never buffered. Each line
+    is either NDJSON (one rule result, or a bundle results file written on one
+    line) or a log line from the audit and bundle templates. Only the latest
+    status per host and rule is kept, so re-uploading a run replaces it rather
+    than counting it twice.
+
+    Hosts and rules are interned to integer indexes. Each host keeps one byte
+    per rule for its latest status, and per-rule and per-host counters live in
+    flat arrays, so the summaries are maintained incrementally on ingest.
+    """
+
+    def __init__(self, max_line_bytes=1024 * 1024, batch_size=2000):
+        """
+        Args:
+            max_line_bytes (int): Longer lines are skipped and counted as errors
+            batch_size (int): Parsed records applied per lock acquisition
+        """
+        self.max_line_bytes = max_line_bytes
+        self.batch_size = batch_size
+
+        self._lock = threading.Lock()
+        self._rule_index = {}
+        self._rule_ids = []
+        self._host_index = {}
+        self._hosts = []
+        self._host_status = []
+        self._host_seen = array('d')
+        self._rule_counts = array('l')
+        self._host_counts = array('l')
+        self._stats = {'uploads': 0, 'lines': 0, 'records': 0, 'errors': 0, 'skipped': 0, 'seconds': 0.0}
+
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    def ingest(self, stream, host=None, compressed=False, default_host='unknown'):
+        """
+        Parse an upload incrementally and fold its results into the aggregates
+
+        Args:
+            stream: Binary file-like object with the upload body
+            host (str): Host named by the uploader; when given it applies to every line,
+                overriding any ``host`` field inside JSON records
+            compressed (bool): Body is gzip-compressed
+            default_host (str): Used when no host is given and a line does not name one
+                (log lines never do)
+
+        Returns:
+            dict: Line, record, error and skipped counts for this upload
+        """
+        if compressed:
+            stream = gzip.GzipFile(fileobj=stream, mode='rb')
+
+        started = time.perf_counter()
+        explicit = bool(host)
+        host = host or default_host
+        upload = {'host': host, 'lines': 0, 'records': 0, 'errors': 0, 'skipped': 0}
+        batch = []
+        pending_rule = None  # single-rule audit log still waiting for its outcome line
+        # Bundle results are held until the run's mode is known; log files append one run after another
+        run_records = []
+        run_mode = None
+        readline = stream.readline
+        limit = self.max_line_bytes
+
+        try:
+            while True:
+                line = readline(limit)
+                if not line:
+                    break
+                upload['lines'] += 1
+
+                if len(line) >= limit and not line.endswith(b'\n'):
+                    while line and not line.endswith(b'\n'):
+                        line = readline(limit)
+                    upload['errors'] += 1
+                    continue
+
+                line = line.strip()
+                if not line:
+                    continue
+                if line[:3] == b'\xef\xbb\xbf':
+                    # UTF-8 BOM from PowerShell or Notepad at the start of a file
+                    line = line[3:]
+
+                if line[:1] == b'{':
+                    self._parse_json(line, host, explicit, batch, upload)
+                else:
+                    match = BUNDLE_RESULT_RE.search(line)
+                    if match:
+                        if run_mode == b'remediation':
+                            upload['skipped'] += 1
+                        else:
+                            run_records.append((host, match.group(1).decode('utf-8', 'replace'),
+                                                _STATUS_CODES.get(match.group(2).decode('ascii', 'replace').lower(),
+                                                                  _ERROR)))
+                    elif b'] Starting ' in line and (match := BUNDLE_START_RE.search(line)):
+                        run_mode = match.group(1)
+                    elif b' bundle completed' in line and (match := BUNDLE_DONE_RE.search(line)):
+                        # Remediation outcomes say nothing about compliance
+                        if match.group(1) == b'Remediation':
+                            upload['skipped'] += len(run_records)
+                        else:
+                            batch.extend(run_records)
+                        run_records = []
+                        run_mode = None
+                    elif b'Starting ' in line and (match := RULE_START_RE.search(line)):
+                        if pending_rule:
+                            # Previous script stopped (set -e) before logging completion
+                            batch.append((host, pending_rule, _FAIL))
+                        pending_rule = match.group(2).decode('utf-8', 'replace') if match.group(1) == b'audit' else None
+                    elif pending_rule and b'Audit completed successfully' in line:
+                        batch.append((host, pending_rule, _PASS))
+                        pending_rule = None
+                    elif pending_rule and b'Error during audit' in line:
+                        batch.append((host, pending_rule, _FAIL))
+                        pending_rule = None
+
+                if len(batch) >= self.batch_size:
+                    self._apply(batch, upload)
+                    batch = []
+
+            if pending_rule:
+                batch.append((host, pending_rule, _FAIL))
+        finally:
+            # A run cut off before its completion line is kept unless it was a remediation
+            batch.extend(run_records)
+            # Records parsed before a corrupt or truncated body are kept
+            self._apply(batch, upload)
+            elapsed = time.perf_counter() - started
+            upload['duration_ms'] = round(elapsed * 1000, 1)
+            with self._lock:
+                self._stats['uploads'] += 1
+                self._stats['seconds'] += elapsed
+                for key in ('lines', 'records', 'errors', 'skipped'):
+                    self._stats[key] += upload[key]
+
+        return upload
+
+    def _parse_json(self, line, host, explicit, batch, upload):
+        try:
+            doc = _decode_json(line.decode('utf-8'))
+        except ValueError:
+            upload['errors'] += 1
+            return
+        if not isinstance(doc, dict):
+            upload['errors'] += 1
+            return
+
+        # One host per upload when the uploader names it, so JSON and log lines agree
+        doc_host = host if explicit else doc.get('host') or host
+        results = doc.get('results')
+        if results is None:
+            self._add_record(batch, doc_host, doc, upload)
+        elif doc.get('script_type', 'audit') != 'audit' or not isinstance(results, list):
+            # Remediation outcomes say nothing about compliance
+            upload['skipped'] += 1
+        else:
+            for record in results:
+                self._add_record(batch, doc_host, record, upload)
+
+    def _add_record(self, batch, host, record, upload):
+        rule_id = record.get('rule_id') if isinstance(record, dict) else None
+        if not isinstance(rule_id, str):
+            rule_id = str(rule_id) if isinstance(rule_id, (int, float)) else None
+        if not rule_id or len(rule_id) > MAX_RULE_ID_LENGTH:
+            upload['errors'] += 1
+            return
+        status = record.get('status')
+        code = _STATUS_CODES.get(status.lower(), _ERROR) if isinstance(status, str) else _ERROR
+        batch.append((host if isinstance(host, str) else str(host), rule_id, code))
+
+    def _apply(self, batch, upload):
+        """Replace each host's latest status per rule and adjust counters (latest upload wins)"""
+        if not batch:
+            return
+        now = time.time()
+        with self._lock:
+            rule_counts = self._rule_counts
+            host_counts = self._host_counts
+            for host, rule_id, code in batch:
+                h = self._host_index.get(host)
+                if h is None:
+                    h = self._add_host(host)
+                r = self._rule_index.get(rule_id)
+                if r is None:
+                    r = self._add_rule(rule_id)
+
+                self._host_seen[h] = now
+                statuses = self._host_status[h]
+                if r >= len(statuses):
+                    statuses.extend(bytes(r + 1 - len(statuses)))
+                old = statuses[r]
+                if old == code:
+                    continue
+                if old:
+                    rule_counts[r * _SLOTS + old - 1] -= 1
+                    host_counts[h * _SLOTS + old - 1] -= 1
+                statuses[r] = code
+                rule_counts[r * _SLOTS + code - 1] += 1
+                host_counts[h * _SLOTS + code - 1] += 1
+        upload['records'] += len(batch)
+
+    def _add_host(self, host):
+        index = len(self._hosts)
+        self._host_index[host] = index
+        self._hosts.append(host)
+        self._host_status.append(bytearray(len(self._rule_ids)))
+        self._host_seen.append(0.0)
+        self._host_counts.extend([0] * _SLOTS)
+        return index
+
+    def _add_rule(self, rule_id):
+        index = len(self._rule_ids)
+        self._rule_index[rule_id] = index
+        self._rule_ids.append(rule_id)
+        self._rule_counts.extend([0] * _SLOTS)
+        return index
+
+    def _counts(self, counters, index):
+        counts = dict(zip(STATUSES, counters[index * _SLOTS:(index + 1) * _SLOTS]))
+        reported = sum(counts.values())
+        counts['compliance'] = round(counts['pass'] / reported, 4) if reported else None
+        return counts
+
+    def _not_passing(self, counters, index):
+        base = index * _SLOTS
+        return counters[base + 1] + counters[base + 2] + counters[base + 3]
+
+    def summary(self, top=10):
+        """Fleet totals, worst rules and ingest throughput"""
+        with self._lock:
+            totals = [sum(self._rule_counts[i::_SLOTS]) for i in range(_SLOTS)]
+            worst = sorted(range(len(self._rule_ids)), key=lambda r: self._not_passing(self._rule_counts, r),
+                           reverse=True)[:top]
+            stats = dict(self._stats)
+            return {
+                'hosts': len(self._hosts),
+                'hosts_failing': sum(1 for h in range(len(self._hosts)) if self._not_passing(self._host_counts, h)),
+                'rules': len(self._rule_ids),
+                'results': dict(zip(STATUSES, totals)),
+                'top_failing_rules': [
+                    dict(rule_id=self._rule_ids[r], **self._counts(self._rule_counts, r))
+                    for r in worst if self._not_passing(self._rule_counts, r)
+                ],
+                'ingest': {
+                    'uploads': stats['uploads'],
+                    'lines': stats['lines'],
+                    'records': stats['records'],
+                    'errors': stats['errors'],
+                    'skipped': stats['skipped'],
+                    'lines_per_second': round(stats['lines'] / stats['seconds']) if stats['seconds'] else 0
+                }
+            }
+
+    def rule_summary(self, rule_id, limit=100):
+        """Counts for one rule and the hosts not passing it (None if never reported)"""
+        with self._lock:
+            r = self._rule_index.get(rule_id)
+            if r is None:
+                return None
+            failing = []
+            for h, statuses in enumerate(self._host_status):
+                if r < len(statuses) and statuses[r] > _PASS:
+                    failing.append({'host': self._hosts[h], 'status': STATUSES[statuses[r] - 1]})
+                    if len(failing) >= limit:
+                        break
+            return dict(rule_id=rule_id, **self._counts(self._rule_counts, r), failing_hosts=failing)
+
+    def host_summary(self, host):
+        """Counts for one host and the rules it is not passing (None if never reported)"""
+        with self._lock:
+            h = self._host_index.get(host)
+            if h is None:
+                return None
+            statuses = self._host_status[h]
+            failing = [
+                {'rule_id': self._rule_ids[r], 'status': STATUSES[code - 1]}
+                for r, code in enumerate(statuses) if code > _PASS
+            ]
+            return dict(host=host, **self._counts(self._host_counts, h),
+                        last_seen=self._host_seen[h], failing_rules=failing)
@@ -0,0 +1,186 @@
+from collections import deque
+from contextlib import contextmanager
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+PRIORITY_CLASSES = ('interactive', 'bulk', 'background')
+
+
+class SchedulerTimeout(Exception):
+    """Raised when a request waits longer than the queue timeout"""
+
+
+def parse_tenant_weights(spec):
+    """
+    Parse tenant weights written as ``tenant=weight`` pairs separated by commas
+
+    Args:
+        spec (str): e.g. "team-a=2,team-b=0.5" (empty for equal shares)
+
+    Returns:
+        dict: Weight per tenant
+    """
+    weights = {}
+    for item in (spec or '').split(','):
+        if not item.strip():
+            continue
+        tenant, sep, weight = item.partition('=')
+        try:
+            value = float(weight)
+        except ValueError:
+            value = 0.0
+        if not sep or not tenant.strip() or not value > 0:
+            raise ValueError(f"Invalid tenant weight: {item.strip()!r} (expected tenant=positive number)")
+        weights[tenant.strip()] = value
+    return weights
+
+
+class _Ticket:
+    __slots__ = ('priority', 'tenant', 'finish_tag', 'enqueued_at', 'granted', 'cancelled')
+
+    def __init__(self, priority, tenant, finish_tag):
+        self.priority = priority
+        self.tenant = tenant
+        self.finish_tag = finish_tag
+        self.enqueued_at = time.perf_counter()
+        self.granted = False
+        self.cancelled = False
+
+
+class PriorityScheduler:
+    """In-process scheduler for LLM and worker-thread heavy requests
+
+    Slots are handed out in strict class order (interactive, bulk, background),
+    subject to a global worker limit and per-class concurrency caps. Within a
+    class, tenants share slots by weighted fair queuing on virtual finish tags,
+    so one tenant submitting many jobs cannot starve the others.
+    """
+
+    def __init__(self, max_workers=8, class_caps=None, tenant_weights=None, queue_timeout=300, wait_samples=1000):
+        """
+        Args:
+            max_workers (int): Total concurrent slots across all classes
+            class_caps (dict): Max concurrent slots per priority class
+            tenant_weights (dict): Relative share per tenant (default 1)
+            queue_timeout (float): Seconds a request may wait before SchedulerTimeout
+            wait_samples (int): Recent queue-wait samples kept per class for percentiles
+        """
+        self.max_workers = max_workers
+        self.class_caps = {name: max_workers for name in PRIORITY_CLASSES}
+        self.class_caps.update(class_caps or {})
+        self.tenant_weights = tenant_weights or {}
+        self.queue_timeout = queue_timeout
+
+        self._cond = threading.Condition()
+        self._queues = {name: [] for name in PRIORITY_CLASSES}
+        self._virtual_time = {name: 0.0 for name in PRIORITY_CLASSES}
+        self._tenant_finish = {name: {} for name in PRIORITY_CLASSES}
+        self._running = {name: 0 for name in PRIORITY_CLASSES}
+        self._sequence = itertools.count()
+
+        self._waits = {name: deque(maxlen=wait_samples) for name in PRIORITY_CLASSES}
+        self._stats = {name: {'completed': 0, 'timeouts': 0, 'wait_total_ms': 0.0, 'wait_max_ms': 0.0}
+                       for name in PRIORITY_CLASSES}
+
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    @contextmanager
+    def slot(self, priority='interactive', tenant='default', cost=1.0):
+        """
+        Block until a slot is granted, then hold it for the duration of the block
+
+        Args:
+            priority (str): One of interactive, bulk, background
+            tenant (str): User or tenant the work is accounted to
+            cost (float): Relative size of the job for fair queuing
+        """
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class: {priority}")
+
+        ticket = self._acquire(priority, tenant, cost)
+        try:
+            yield
+        finally:
+            self._release(ticket)
+
+    def _acquire(self, priority, tenant, cost):
+        with self._cond:
+            weight = float(self.tenant_weights.get(tenant, 1.0))
+            start_tag = max(self._virtual_time[priority], self._tenant_finish[priority].get(tenant, 0.0))
+            ticket = _Ticket(priority, tenant, start_tag + cost / weight)
+            self._tenant_finish[priority][tenant] = ticket.finish_tag
+            heapq.heappush(self._queues[priority], (ticket.finish_tag, next(self._sequence), ticket))
+            self._dispatch()
+
+            deadline = ticket.enqueued_at + self.queue_timeout
+            while not ticket.granted:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    ticket.cancelled = True
+                    self._stats[priority]['timeouts'] += 1
+                    self.logger.warning(f"Scheduler timeout for {priority} request from tenant {tenant}")
+                    raise SchedulerTimeout(f"Timed out waiting for a {priority} slot")
+                self._cond.wait(remaining)
+
+            wait_ms = (time.perf_counter() - ticket.enqueued_at) * 1000
+            self._waits[priority].append(wait_ms)
+            stats = self._stats[priority]
+            stats['wait_total_ms'] += wait_ms
+            stats['wait_max_ms'] = max(stats['wait_max_ms'], wait_ms)
+            return ticket
+
+    def _release(self, ticket):
+        with self._cond:
+            self._running[ticket.priority] -= 1
+            self._stats[ticket.priority]['completed'] += 1
+            self._dispatch()
+
+    def _dispatch(self):
+        """Grant slots to waiting tickets while capacity remains (caller holds the lock)"""
+        granted = False
+        while sum(self._running.values()) < self.max_workers:
+            ticket = self._next_ticket()
+            if ticket is None:
+                break
+            ticket.granted = True
+            self._running[ticket.priority] += 1
+            self._virtual_time[ticket.priority] = ticket.finish_tag
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _next_ticket(self):
+        for name in PRIORITY_CLASSES:
+            if self._running[name] >= self.class_caps[name]:
+                continue
+            queue = self._queues[name]
+            while queue:
+                _, _, ticket = heapq.heappop(queue)
+                if not ticket.cancelled:
+                    return ticket
+        return None
+
+    def snapshot(self):
+        """Queue depth, running slots and queue-wait metrics per class"""
+        with self._cond:
+            classes = {}
+            for name in PRIORITY_CLASSES:
+                waits = sorted(self._waits[name])
+                stats = self._stats[name]
+                admitted = stats['completed'] + self._running[name]
+                classes[name] = {
+                    'cap': self.class_caps[name],
+                    'running': self._running[name],
+                    'queued': sum(1 for _, _, t in self._queues[name] if not t.cancelled),
+                    'completed': stats['completed'],
+                    'timeouts': stats['timeouts'],
+                    'wait_avg_ms': round(stats['wait_total_ms'] / admitted, 1) if admitted else 0.0,
+                    'wait_p50_ms': round(waits[len(waits) // 2], 1) if waits else 0.0,
+                    'wait_p95_ms': round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 1) if waits else 0.0,
+                    'wait_max_ms': round(stats['wait_max_ms'], 1)
+                }
+            return {'max_workers': self.max_workers, 'classes': classes}
@@ -0,0 +1,141 @@
+from collections import Counter
+import logging
+import re
+
+# Rough chars-per-token ratio for English prose and shell commands
+CHARS_PER_TOKEN = 4
+
+PAGE_NUMBER_RE = re.compile(r'^(page\s+)?\d+(\s*(of|/)\s*\d+)?$', re.IGNORECASE)
+RULE_HEADING_RE = re.compile(r'^\d+(\.\d+)+\s+(\(L\d\)\s+)?Ensure\b')
+HYPHEN_BREAK_RE = re.compile(r'([a-z])-\n([a-z])')
+INLINE_SPACE_RE = re.compile(r'[ \t\u00a0]+')
+BLANK_LINES_RE = re.compile(r'\n{3,}')
+
+
+def estimate_tokens(text):
+    """Estimate the LLM token count of a text without a tokenizer."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class TextNormalizer:
+    """Service for cleaning extracted PDF text before parsing and prompting"""
+
+    def __init__(self, edge_lines=2, min_repeat_ratio=0.5, max_masked_length=60):
+        """
+        Args:
+            edge_lines (int): Lines at the top and bottom of each page checked for headers/footers
+            min_repeat_ratio (float): Fraction of pages a line must repeat on to be stripped
+            max_masked_length (int): Longest line matched with its digits masked (e.g. "Page 3 of 90")
+        """
+        self.edge_lines = edge_lines
+        self.min_repeat_ratio = min_repeat_ratio
+        self.max_masked_length = max_masked_length
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    def normalize_pages(self, pages):
+        """
+        Strip running headers/footers and page numbers, de-hyphenate and collapse whitespace
+
+        Args:
+            pages (list): Extracted text of each page
+
+        Returns:
+            tuple: (normalized text, stats dict with bytes/tokens saved)
+        """
+        original = "".join(pages)
+        page_lines = [[self._clean_line(line) for line in page.splitlines()] for page in pages]
+        repeated = self._find_repeated_lines(page_lines)
+
+        removed = 0
+        kept_pages = []
+        for lines in page_lines:
+            edges = self._edge_positions(lines)
+            kept = []
+            for index, line in enumerate(lines):
+                if index in edges and self._is_page_furniture(line, edges[index], repeated):
+                    removed += 1
+                    continue
+                kept.append(line)
+            kept_pages.append("\n".join(kept))
+
+        text = self.normalize_text("\n".join(kept_pages))
+        stats = self._build_stats(original, text, len(pages), removed, len(repeated))
+        self.logger.info(
+            f"Normalized text: {stats['original_bytes']} -> {stats['normalized_bytes']} bytes "
+            f"({stats['saved_pct']}% saved, ~{stats['tokens_saved']} tokens)"
+        )
+        return text, stats
+
+    def normalize_text(self, text):
+        """De-hyphenate line breaks and collapse layout whitespace"""
+        text = HYPHEN_BREAK_RE.sub(r'\1\2', text)
+        text = "\n".join(self._clean_line(line) for line in text.splitlines())
+        text = BLANK_LINES_RE.sub('\n\n', text)
+        return text.strip()
+
+    def _clean_line(self, line):
+        return INLINE_SPACE_RE.sub(' ', line).strip()
+
+    def _edge_positions(self, lines):
+        """Map the first and last non-empty lines of a page to their position from that edge"""
+        non_empty = [i for i, line in enumerate(lines) if line]
+        positions = {}
+        for offset, index in enumerate(non_empty[:self.edge_lines]):
+            positions[index] = ('top', offset)
+        for offset, index in enumerate(reversed(non_empty[-self.edge_lines:])):
+            positions.setdefault(index, ('bottom', offset))
+        return positions
+
+    def _line_keys(self, line, position):
+        """Keys a line is counted under: exact text, plus digit-masked text for short lines"""
+        keys = [(position, line)]
+        if len(line) <= self.max_masked_length and any(c.isdigit() for c in line):
+            keys.append((position, re.sub(r'\d+', '#', line)))
+        return keys
+
+    def _find_repeated_lines(self, page_lines):
+        """Count edge lines across pages and return the keys frequent enough to be page furniture"""
+        if len(page_lines) < 2:
+            return set()
+
+        counts = Counter()
+        for lines in page_lines:
+            keys = set()
+            for index, position in self._edge_positions(lines).items():
+                if not RULE_HEADING_RE.match(lines[index]):
+                    keys.update(self._line_keys(lines[index], position))
+            counts.update(keys)
+
+        threshold = max(2, int(len(page_lines) * self.min_repeat_ratio))
+        return {key for key, count in counts.items() if count >= threshold}
+
+    def _is_page_furniture(self, line, position, repeated):
+        if not line:
+            return False
+        if PAGE_NUMBER_RE.match(line):
+            # Only a number that repeats as a page number across pages, at the same edge (its offset
+            # can shift when a footer line is missing); a lone "0" of command output is kept
+            masked = re.sub(r'\d+', '#', line)
+            return any(((position[0], offset), masked) in repeated for offset in range(self.edge_lines))
+        if RULE_HEADING_RE.match(line):
+            return False
+        return any(key in repeated for key in self._line_keys(line, position))
+
+    def _build_stats(self, original, text, page_count, removed, repeated_count):
+        original_bytes = len(original.encode('utf-8'))
+        normalized_bytes = len(text.encode('utf-8'))
+        original_tokens = estimate_tokens(original)
+        normalized_tokens = estimate_tokens(text)
+        return {
+            'pages': page_count,
+            'header_footer_lines_removed': removed,
+            'repeated_patterns': repeated_count,
+            'original_bytes': original_bytes,
+            'normalized_bytes': normalized_bytes,
+            'bytes_saved': original_bytes - normalized_bytes,
+            'saved_pct': round(100.0 * (original_bytes - normalized_bytes) / original_bytes, 1) if original_bytes else 0.0,
+            'original_tokens': original_tokens,
+            'normalized_tokens': normalized_tokens,
+            'tokens_saved': original_tokens - normalized_tokens
+        }
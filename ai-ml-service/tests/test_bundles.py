@@ -0,0 +1,81 @@
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from src.models.bundles import build_bundle, parse_bundle_options, render_bundle
+from src.models.engines import load_templates
+
+
+def test_parse_bundle_options():
+    assert parse_bundle_options({'policies': ['1.1.1']}) == (4, 300)
+    assert parse_bundle_options({'policies': ['1.1.1'], 'maxParallel': '8', 'checkTimeout': 0}) == (8, 0)
+    for bad in ({'maxParallel': 'abc'}, {'maxParallel': 0}, {'checkTimeout': -1}, {'maxParallel': True}):
+        with pytest.raises(ValueError):
+            parse_bundle_options(dict(bad, policies=['1.1.1']))
+
+
+@pytest.mark.parametrize('policies', [None, [], '1.1.1 Ensure x', ['1.1.1', 7], ['1.1.1', '  ']])
+def test_parse_bundle_options_rejects_bad_policies(policies):
+    with pytest.raises(ValueError):
+        parse_bundle_options({'policies': policies})
+
+
+def test_build_bundle_emits_only_referenced_helpers():
+    templates, functions = load_templates()
+    steps = {'steps': 'check_sysctl_value "kernel.pid_max" "32768"', 'helpers': [], 'confidence': 1.0,
+             'engine': 'rules'}
+    bundle = build_bundle(["1.1.1 Ensure 'x' (L1)", "no rule id"], lambda policy, info: dict(steps),
+                          templates['linux']['bundle'], functions['linux'], 'linux', 'audit')
+
+    assert [r['rule_id'] for r in bundle['rules']] == ['1.1.1', 'rule_2']
+    assert bundle['script'].count('check_sysctl_value() {') == 1
+    assert 'set_sysctl_value() {' not in bundle['script']
+    assert 'start_rule 1 "1.1.1" rule_1_1_1_1' in bundle['script']
+
+
+def test_remediation_bundles_run_sequentially():
+    templates, functions = load_templates()
+    sections = [{'rule_id': '1.1.1', 'result': {'steps': 'true'}}]
+    script = render_bundle(templates['linux']['bundle'], functions['linux'], 'linux', 'remediation', sections,
+                           max_parallel=8, check_timeout=60)
+    assert 'MAX_PARALLEL=1' in script
+    assert 'CHECK_TIMEOUT=${CHECK_TIMEOUT:-0}' in script
+
+
+@pytest.mark.skipif(not shutil.which('bash') or not os.path.isdir('/proc/self'), reason='needs bash and /proc')
+def test_rule_that_dies_is_reported_under_its_own_id(tmp_path):
+    templates, functions = load_templates()
+    # Kill the rule's run_rule job so it never writes a result file
+    die = 'parent=$(cut -d" " -f4 /proc/$BASHPID/stat); kill -9 $(cut -d" " -f4 /proc/$parent/stat)'
+    sections = [{'rule_id': '1.1.1', 'result': {'steps': 'true'}}, {'rule_id': '2.2.2', 'result': {'steps': die}}]
+    script = tmp_path / 'bundle.sh'
+    script.write_text(render_bundle(templates['linux']['bundle'], functions['linux'], 'linux', 'audit', sections,
+                                    max_parallel=2, check_timeout=0))
+
+    assert subprocess.run(['bash', str(script)], cwd=tmp_path, capture_output=True, timeout=30).returncode == 1
+    results = json.loads((tmp_path / 'audit_bundle_results.json').read_text())['results']
+    assert [(r['rule_id'], r['status']) for r in results] == [('1.1.1', 'pass'), ('2.2.2', 'error')]
+
+
+def test_powershell_rules_always_run_in_runspaces():
+    templates, functions = load_templates()
+    sections = [{'rule_id': '1.1.1', 'result': {'steps': 'exit 1'}}]
+    script = render_bundle(templates['windows']['bundle'], functions['windows'], 'windows', 'remediation', sections)
+
+    assert '& $rule.Body' not in script
+    assert 'CreateRunspacePool(1, [math]::Max(1, $MaxParallel))' in script
+    assert "@{ Id = '1.1.1'; Body = {\nexit 1\n} }" in script
+
+
+def test_powershell_timeouts_start_with_each_runspace():
+    templates, functions = load_templates()
+    sections = [{'rule_id': '1.1.1', 'result': {'steps': 'Start-Sleep 5'}}]
+    script = render_bundle(templates['windows']['bundle'], functions['windows'], 'windows', 'audit', sections,
+                           check_timeout=2)
+
+    assert 'param(`$State)`n`$State.Started = Get-Date' in script
+    assert '((Get-Date) - $job.State.Started).TotalSeconds -ge $CheckTimeout' in script
+    assert 'WaitOne(' not in script
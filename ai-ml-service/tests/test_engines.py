@@ -0,0 +1,119 @@
+import pytest
+
+from src.models.engines import CallbackEngine, EngineRegistry, RuleEngine
+
+
+def _rules(text, os_key='linux', script_type='audit'):
+    return RuleEngine().generate({
+        'policy': text,
+        'remediation_steps': None,
+        'script_type': script_type,
+        'os_key': os_key
+    })
+
+
+def test_fully_covered_linux_rule_is_confident():
+    result = _rules(
+        "3.1.1 Ensure IP forwarding is disabled (L1)\n"
+        "Audit:\n# sysctl net.ipv4.ip_forward\n# grep net.ipv4.ip_forward /etc/sysctl.conf\n"
+        "Remediation:\n# sysctl -w net.ipv4.ip_forward=0\n"
+    )
+    assert result['confidence'] == 1.0
+    assert result['uncovered'] == []
+    assert 'check_sysctl_value "net.ipv4.ip_forward" "0"' in result['steps']
+
+
+CIS_IP_FORWARD = (
+    "3.3.1 Ensure ip forwarding is disabled (Automated)\n"
+    "Audit:\n"
+    "Run the following command to verify net.ipv4.ip_forward is set to 0:\n"
+    "# sysctl net.ipv4.ip_forward\n"
+    "net.ipv4.ip_forward = 0\n"
+    "Remediation:\n"
+    "Set the following parameter in /etc/sysctl.conf or a /etc/sysctl.d/* file:\n"
+    "net.ipv4.ip_forward = 0\n"
+    "Run the following commands to set the active kernel parameters:\n"
+    "# sysctl -w net.ipv4.ip_forward=0\n"
+    "# sysctl -w net.ipv4.route.flush=1\n"
+)
+
+
+def test_route_flush_is_an_action_not_a_check():
+    audit = _rules(CIS_IP_FORWARD)
+    assert audit['confidence'] == 1.0
+    assert 'route.flush' not in audit['steps']
+
+    remediation = _rules(CIS_IP_FORWARD, script_type='remediation')
+    assert remediation['confidence'] == 1.0
+    steps = remediation['steps'].splitlines()
+    assert steps[1:4] == [
+        'set_sysctl_value "net.ipv4.ip_forward" "0"',
+        'check_sysctl_value "net.ipv4.ip_forward" "0" || failed=$((failed + 1))',
+        'apply_sysctl_action "net.ipv4.route.flush" "1"'
+    ]
+    assert 'set_sysctl_value "net.ipv4.route.flush"' not in remediation['steps']
+    assert 'apply_sysctl' in remediation['helpers']
+
+
+def test_systemctl_line_with_several_units():
+    result = _rules(
+        "2.2.2 Ensure Avahi Server is not installed (Automated)\n"
+        "# systemctl stop avahi-daemon.service\n"
+        "# systemctl --now mask avahi-daemon.socket avahi-daemon.service\n",
+        script_type='remediation'
+    )
+    for unit in ('avahi-daemon.socket', 'avahi-daemon.service'):
+        assert f'set_service_status "{unit}" "masked"' in result['steps']
+        assert f'check_service_status "{unit}" "masked" || failed=$((failed + 1))' in result['steps']
+    assert result['uncovered'] == ['systemctl stop avahi-daemon.service']
+
+
+def test_unhandled_command_lowers_confidence_and_fails_audit():
+    result = _rules(
+        "5.2.1 Ensure permissions on /etc/ssh/sshd_config are configured (L1)\n"
+        "# chmod 600 /etc/ssh/sshd_config\n# chown root:root /etc/ssh/sshd_config\n"
+    )
+    assert result['confidence'] < 0.5
+    assert result['uncovered'] == ['chown root:root /etc/ssh/sshd_config']
+    assert "log 'Manual review required: chown root:root /etc/ssh/sshd_config'; failed=$((failed + 1))" \
+        in result['steps']
+
+
+def test_symbolic_chmod_alone_is_not_handled():
+    assert _rules("# chmod u-x,og-rwx /etc/ssh/sshd_config") is None
+
+
+def test_windows_keys_are_paired_with_their_own_values():
+    result = _rules(
+        "HKLM\\SYSTEM\\A:One REG_DWORD value of 1.\nHKLM\\SYSTEM\\B:Two REG_DWORD value of 0.",
+        os_key='windows'
+    )
+    assert result['confidence'] == 1.0
+    assert "-Name 'One' -ExpectedValue '1'" in result['steps']
+    assert "-Name 'Two' -ExpectedValue '0'" in result['steps']
+
+
+def test_windows_keys_without_own_values_are_not_guessed():
+    assert _rules("HKLM\\SYSTEM\\A:One and HKLM\\SYSTEM\\B:Two, REG_DWORD value of 1", os_key='windows') is None
+
+
+def test_registry_falls_through_on_low_confidence():
+    registry = EngineRegistry(min_confidence=0.8)
+    registry.register(RuleEngine())
+    registry.register(CallbackEngine('llm', lambda request: {'steps': 'llm', 'helpers': [], 'confidence': 0.9}))
+    request = {
+        'policy': "# chmod 600 /etc/ssh/sshd_config\n# chown root:root /etc/ssh/sshd_config",
+        'remediation_steps': None,
+        'script_type': 'audit',
+        'os_key': 'linux'
+    }
+    assert registry.generate(request)['engine'] == 'llm'
+
+    request['policy'] = "# chmod 600 /etc/ssh/sshd_config"
+    assert registry.generate(request)['engine'] == 'rules'
+    assert registry.stats()['engines']['llm']['served'] == 1
+
+
+def test_registry_raises_when_no_engine_applies():
+    with pytest.raises(ValueError):
+        EngineRegistry().generate({'policy': '', 'os_key': 'linux', 'script_type': 'audit'})
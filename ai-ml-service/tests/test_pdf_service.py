@@ -0,0 +1,30 @@
+import pytest
+
+from src.services.pdf_service import PDFService
+
+
+@pytest.fixture
+def pdf_service():
+    return PDFService()
+
+
+def test_parse_page_spec(pdf_service):
+    assert pdf_service.parse_page_spec('1-5, 9,12 - 20') == [(1, 5), (9, 9), (12, 20)]
+    assert pdf_service.parse_page_spec('250-') == [(250, None)]
+
+
+@pytest.mark.parametrize('spec', ['', ' , ', '0', '5-3', '-5', 'a-b', '1-x', '1-2-3'])
+def test_parse_page_spec_rejects_malformed(pdf_service, spec):
+    with pytest.raises(ValueError):
+        pdf_service.parse_page_spec(spec)
+
+
+def test_parse_page_ranges_merges_and_clamps(pdf_service):
+    assert pdf_service.parse_page_ranges('9,1-5,4-7,12-', 15) == [(1, 7), (9, 9), (12, 15)]
+    assert pdf_service.parse_page_ranges([(8, 30)], 10) == [(8, 10)]
+    assert pdf_service.parse_page_ranges('5-', 5) == [(5, 5)]
+
+
+def test_parse_page_ranges_outside_document(pdf_service):
+    with pytest.raises(ValueError):
+        pdf_service.parse_page_ranges('20-', 10)
@@ -0,0 +1,195 @@
+import gzip
+import io
+import json
+
+import pytest
+from flask import Flask
+
+from src.routes.results import create_results_blueprint
+from src.services.results_aggregator import ResultsAggregator
+
+
+def _ndjson(*records):
+    return io.BytesIO(''.join(json.dumps(r) + '\n' for r in records).encode())
+
+
+def _bundle(host, statuses, script_type='audit'):
+    return {
+        'script_type': script_type,
+        'host': host,
+        'results': [{'rule_id': rule_id, 'status': status} for rule_id, status in statuses.items()]
+    }
+
+
+def test_reupload_replaces_instead_of_double_counting():
+    aggregator = ResultsAggregator()
+    aggregator.ingest(_ndjson(_bundle('web-01', {'1.1.1': 'fail', '1.1.2': 'pass'})))
+    aggregator.ingest(_ndjson(_bundle('web-01', {'1.1.1': 'pass', '1.1.2': 'pass'})))
+
+    summary = aggregator.summary()
+    assert summary['hosts'] == 1
+    assert summary['hosts_failing'] == 0
+    assert summary['results'] == {'pass': 2, 'fail': 0, 'timeout': 0, 'error': 0}
+    rule = aggregator.rule_summary('1.1.1')
+    assert (rule['pass'], rule['fail'], rule['failing_hosts']) == (1, 0, [])
+
+
+def test_rule_and_host_summaries():
+    aggregator = ResultsAggregator()
+    aggregator.ingest(_ndjson(
+        _bundle('web-01', {'1.1.1': 'fail', '1.1.2': 'pass'}),
+        _bundle('web-02', {'1.1.1': 'timeout', '1.1.2': 'pass'}),
+        _bundle('web-03', {'1.1.1': 'pass', '1.1.2': 'pass'}),
+    ))
+
+    rule = aggregator.rule_summary('1.1.1')
+    assert rule['compliance'] == pytest.approx(1 / 3, abs=1e-4)
+    assert rule['failing_hosts'] == [{'host': 'web-01', 'status': 'fail'}, {'host': 'web-02', 'status': 'timeout'}]
+    assert aggregator.host_summary('web-02')['failing_rules'] == [{'rule_id': '1.1.1', 'status': 'timeout'}]
+    assert aggregator.summary(top=1)['top_failing_rules'][0]['rule_id'] == '1.1.1'
+    assert aggregator.rule_summary('9.9.9') is None
+    assert aggregator.host_summary('nope') is None
+
+
+def test_bundle_log_lines():
+    log = (
+        b"2026-10-19 10:00:00: [1.1.1] Starting audit\n"
+        b"2026-10-19 10:00:00: [1.1.1] PASS: kernel.pid_max = 32768\n"
+        b"2026-10-19 10:00:00: [1.1.1] Finished: pass (exit 0)\n"
+        b"2026-10-19 10:00:01: [1.1.2] Finished: timeout (exit 124)\n"
+        b"2026-10-19 10:00:02: Audit bundle completed: 1 of 2 rules failed\n"
+    )
+    aggregator = ResultsAggregator()
+    upload = aggregator.ingest(io.BytesIO(log), 'web-01')
+
+    assert (upload['lines'], upload['records'], upload['errors']) == (5, 2, 0)
+    host = aggregator.host_summary('web-01')
+    assert (host['pass'], host['timeout']) == (1, 1)
+
+
+def test_remediation_runs_in_bundle_logs_are_skipped():
+    log = (
+        b"2026-10-19 10:00:00: [1.1.1] Starting audit\n"
+        b"2026-10-19 10:00:00: [1.1.1] Finished: fail (exit 1)\n"
+        b"2026-10-19 10:00:00: Audit bundle completed: 1 of 1 rules failed\n"
+        b"2026-10-19 10:01:00: [1.1.1] Starting remediation\n"
+        b"2026-10-19 10:01:00: [1.1.1] Finished: pass (exit 0)\n"
+        b"2026-10-19 10:01:00: Remediation bundle completed: 0 of 1 rules failed\n"
+        # Run without its start lines, known to be a remediation only from its completion line
+        b"2026-10-19 10:02:00: [1.1.2] Finished: pass (exit 0)\n"
+        b"2026-10-19 10:02:00: Remediation bundle completed: 0 of 1 rules failed\n"
+        # Cut off before its completion line
+        b"2026-10-19 10:03:00: [1.1.3] Starting audit\n"
+        b"2026-10-19 10:03:00: [1.1.3] Finished: pass (exit 0)\n"
+    )
+    aggregator = ResultsAggregator()
+    upload = aggregator.ingest(io.BytesIO(log), 'web-01')
+
+    assert (upload['records'], upload['skipped']) == (2, 2)
+    host = aggregator.host_summary('web-01')
+    assert host['failing_rules'] == [{'rule_id': '1.1.1', 'status': 'fail'}]
+    assert host['pass'] == 1
+    assert aggregator.rule_summary('1.1.2') is None
+
+
+def test_single_rule_logs_without_completion_count_as_failures():
+    log = (
+        b"2026-10-19 10:00:00: Starting audit for Rule 1.1.1\n"
+        b"2026-10-19 10:00:01: Audit completed successfully\n"
+        b"2026-10-19 10:00:02: Starting audit for Rule 1.1.2\n"
+        b"2026-10-19 10:00:02: Starting audit for Rule 1.1.3\n"
+        b"2026-10-19 10:00:02: Error during audit: access denied\n"
+        b"2026-10-19 10:00:03: Starting remediation for Rule 1.1.5\n"
+        b"2026-10-19 10:00:03: Starting audit for Rule 1.1.4\n"
+    )
+    aggregator = ResultsAggregator()
+    aggregator.ingest(io.BytesIO(log), 'web-01')
+
+    host = aggregator.host_summary('web-01')
+    assert host['pass'] == 1
+    assert [r['rule_id'] for r in host['failing_rules']] == ['1.1.2', '1.1.3', '1.1.4']
+    assert aggregator.rule_summary('1.1.5') is None
+
+
+def test_explicit_host_applies_to_json_and_log_lines():
+    body = json.dumps(_bundle('vm', {'1.1.1': 'pass'})).encode() + b"\n" \
+        + b"2026-10-19 10:00:00: [1.1.1] Finished: pass (exit 0)\n"
+    aggregator = ResultsAggregator()
+    aggregator.ingest(io.BytesIO(body), 'web-01')
+
+    assert aggregator.summary()['hosts'] == 1
+    assert aggregator.host_summary('web-01')['pass'] == 1
+    assert aggregator.host_summary('vm') is None
+
+
+def test_embedded_hosts_used_without_explicit_host():
+    aggregator = ResultsAggregator()
+    aggregator.ingest(_ndjson(
+        {'host': 'a', 'rule_id': '1.1.1', 'status': 'pass'},
+        {'host': 'b', 'rule_id': '1.1.1', 'status': 'fail'},
+        {'rule_id': '1.1.1', 'status': 'pass'},
+    ), default_host='10.0.0.9')
+
+    assert {h: aggregator.host_summary(h)['fail'] for h in ('a', 'b', '10.0.0.9')} == {'a': 0, 'b': 1, '10.0.0.9': 0}
+
+
+def test_status_is_case_insensitive_and_bad_lines_are_counted():
+    aggregator = ResultsAggregator()
+    upload = aggregator.ingest(io.BytesIO(
+        b'{"rule_id": "1.1.1", "status": "PASS"}\n'
+        b'{"rule_id": "1.1.2", "status": "Fail"}\n'
+        b'{"rule_id": "1.1.3", "status": "unknown"}\n'
+        b'{not json\n'
+        b'{"status": "pass"}\n'
+    ), 'web-01')
+
+    assert (upload['records'], upload['errors']) == (3, 2)
+    host = aggregator.host_summary('web-01')
+    assert (host['pass'], host['fail'], host['error']) == (1, 1, 1)
+
+
+def test_remediation_bundles_are_skipped():
+    aggregator = ResultsAggregator()
+    upload = aggregator.ingest(_ndjson(_bundle('web-01', {'1.1.1': 'pass'}, script_type='remediation')))
+
+    assert (upload['records'], upload['skipped']) == (0, 1)
+
+
+def test_gzip_and_truncated_gzip():
+    body = b''.join(b'{"rule_id": "1.1.%d", "status": "pass"}\n' % i for i in range(5000))
+    aggregator = ResultsAggregator(batch_size=100)
+    assert aggregator.ingest(io.BytesIO(gzip.compress(body)), 'web-01', compressed=True)['records'] == 5000
+
+    truncated = gzip.compress(body.replace(b'pass', b'fail'))[:-200]
+    with pytest.raises(EOFError):
+        aggregator.ingest(io.BytesIO(truncated), 'web-01', compressed=True)
+    # Lines decoded before the damage are applied; the rest keep their earlier status
+    host = aggregator.host_summary('web-01')
+    assert host['fail'] > 0 and host['pass'] > 0
+    assert host['pass'] + host['fail'] == 5000
+    assert aggregator.summary()['ingest']['uploads'] == 2
+
+
+def test_overlong_lines_are_skipped():
+    aggregator = ResultsAggregator(max_line_bytes=64)
+    upload = aggregator.ingest(io.BytesIO(b'x' * 200 + b'\n{"rule_id": "1.1.1", "status": "pass"}\n'), 'web-01')
+
+    assert (upload['errors'], upload['records']) == (1, 1)
+
+
+def test_results_blueprint():
+    app = Flask(__name__)
+    app.register_blueprint(create_results_blueprint(ResultsAggregator()))
+    client = app.test_client()
+
+    body = gzip.compress(json.dumps(_bundle('vm', {'1.1.1': 'fail'})).encode() + b'\n')
+    response = client.post('/results', data=body, headers={'Content-Encoding': 'gzip', 'X-Host-ID': 'web-01'})
+    assert response.status_code == 200
+    assert response.get_json()['records'] == 1
+
+    assert client.get('/results/hosts/web-01').get_json()['fail'] == 1
+    assert client.get('/results/rules/1.1.1').get_json()['failing_hosts'] == [{'host': 'web-01', 'status': 'fail'}]
+    assert client.get('/results/hosts/vm').status_code == 404
+
+    response = client.post('/results', data=b'\x1f\x8bgarbage', headers={'Content-Encoding': 'gzip'})
+    assert response.status_code == 400
@@ -0,0 +1,138 @@
+import threading
+import time
+
+import pytest
+
+from src.services.scheduler import PriorityScheduler, SchedulerTimeout, parse_tenant_weights
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+def _queued(scheduler):
+    return sum(c['queued'] for c in scheduler.snapshot()['classes'].values())
+
+
+def _run_queued(scheduler, jobs):
+    """Hold the only slot, queue jobs one at a time, then release and return grant order."""
+    order = []
+    hold = threading.Event()
+    holder_ready = threading.Event()
+
+    def holder():
+        with scheduler.slot('interactive', 'holder'):
+            holder_ready.set()
+            hold.wait()
+
+    def job(priority, tenant, label):
+        with scheduler.slot(priority, tenant):
+            order.append(label)
+
+    threads = [threading.Thread(target=holder)]
+    threads[0].start()
+    holder_ready.wait()
+    for i, (priority, tenant, label) in enumerate(jobs):
+        thread = threading.Thread(target=job, args=(priority, tenant, label))
+        thread.start()
+        threads.append(thread)
+        _wait_for(lambda: _queued(scheduler) == i + 1)
+    hold.set()
+    for thread in threads:
+        thread.join(timeout=5)
+    return order
+
+
+def test_higher_priority_class_is_granted_first():
+    scheduler = PriorityScheduler(max_workers=1)
+    order = _run_queued(scheduler, [
+        ('background', 't', 'background'),
+        ('bulk', 't', 'bulk'),
+        ('interactive', 't', 'interactive'),
+    ])
+    assert order == ['interactive', 'bulk', 'background']
+
+
+def test_tenants_interleave_within_a_class():
+    scheduler = PriorityScheduler(max_workers=1)
+    jobs = [('bulk', 'a', f'a{i}') for i in range(3)] + [('bulk', 'b', f'b{i}') for i in range(3)]
+    order = _run_queued(scheduler, jobs)
+    assert order == ['a0', 'b0', 'a1', 'b1', 'a2', 'b2']
+
+
+def test_tenant_weight_gives_larger_share():
+    scheduler = PriorityScheduler(max_workers=1, tenant_weights={'big': 2})
+    jobs = [('bulk', 'big', f'big{i}') for i in range(4)] + [('bulk', 'small', f'small{i}') for i in range(2)]
+    order = _run_queued(scheduler, jobs)
+    # Finish tags: big 0.5, 1, 1.5, 2 and small 1, 2 (ties go to the earlier request)
+    assert order == ['big0', 'big1', 'small0', 'big2', 'big3', 'small1']
+
+
+def test_class_cap_leaves_room_for_other_classes():
+    scheduler = PriorityScheduler(max_workers=2, class_caps={'background': 1})
+    release = threading.Event()
+    started = threading.Event()
+
+    def background():
+        with scheduler.slot('background', 't'):
+            started.set()
+            release.wait()
+
+    thread = threading.Thread(target=background)
+    thread.start()
+    started.wait()
+    scheduler.queue_timeout = 0.05
+    with pytest.raises(SchedulerTimeout):
+        with scheduler.slot('background', 't'):
+            pass
+    with scheduler.slot('interactive', 't'):
+        assert scheduler.snapshot()['classes']['interactive']['running'] == 1
+    release.set()
+    thread.join(timeout=5)
+
+
+def test_timeout_is_counted_and_slot_recovers():
+    scheduler = PriorityScheduler(max_workers=1, queue_timeout=0.05)
+    release = threading.Event()
+    started = threading.Event()
+
+    def holder():
+        with scheduler.slot('interactive', 't'):
+            started.set()
+            release.wait()
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    started.wait()
+    with pytest.raises(SchedulerTimeout):
+        with scheduler.slot('bulk', 't'):
+            pass
+    release.set()
+    thread.join(timeout=5)
+
+    # The cancelled ticket must not hold or block the slot
+    with scheduler.slot('bulk', 't'):
+        pass
+    bulk = scheduler.snapshot()['classes']['bulk']
+    assert bulk['timeouts'] == 1
+    assert bulk['completed'] == 1
+    assert bulk['queued'] == 0
+    assert bulk['running'] == 0
+
+
+def test_unknown_priority_is_rejected():
+    with pytest.raises(ValueError):
+        with PriorityScheduler().slot('urgent'):
+            pass
+
+
+def test_parse_tenant_weights():
+    assert parse_tenant_weights('') == {}
+    assert parse_tenant_weights(' team-a=2, team-b=0.5 ,') == {'team-a': 2.0, 'team-b': 0.5}
+    for spec in ('team-a', 'team-a=0', 'team-a=-1', '=2', 'team-a=heavy'):
+        with pytest.raises(ValueError):
+            parse_tenant_weights(spec)
@@ -0,0 +1,51 @@
+from src.services.text_normalizer import TextNormalizer, estimate_tokens
+
+
+def _page(number, body):
+    return f"CIS Ubuntu Linux Benchmark\n{body}\nPage {number}"
+
+
+def test_running_headers_and_page_numbers_are_removed():
+    bodies = ["Intro paragraph", "Audit steps follow", "Remediation text", "Default value", "References"]
+    pages = [_page(n, f"{body}\nfirst detail line\nsecond detail line\n{body} ends") for n, body in enumerate(bodies, 1)]
+    text, stats = TextNormalizer().normalize_pages(pages)
+
+    assert 'CIS Ubuntu Linux Benchmark' not in text
+    assert 'Page ' not in text
+    assert 'Remediation text' in text and text.count('first detail line') == 5
+    assert stats['header_footer_lines_removed'] == 10
+    assert stats['bytes_saved'] > 0
+
+
+def test_bare_page_numbers_removed_only_when_repeated_across_pages():
+    pages = [f"Body of page {n}\nsome text\n{n}" for n in range(1, 5)]
+    text, _ = TextNormalizer().normalize_pages(pages)
+    assert not any(line.isdigit() for line in text.splitlines())
+
+    # A trailing "0" of command output on one page is not a page number
+    pages = ["Header A\nRun:\n# sysctl -n kernel.x\n0", "Header B\nOther text\nmore"]
+    text, _ = TextNormalizer().normalize_pages(pages)
+    assert text.splitlines()[3] == '0'
+
+
+def test_single_page_keeps_everything():
+    text, stats = TextNormalizer().normalize_pages(["Title\nbody\n7"])
+    assert text == "Title\nbody\n7"
+    assert stats['header_footer_lines_removed'] == 0
+
+
+def test_rule_headings_at_page_edges_are_kept():
+    pages = [f"1.1.{n} Ensure thing {n} is configured (Automated)\nbody\nfooter" for n in range(1, 5)]
+    text, _ = TextNormalizer().normalize_pages(pages)
+    assert text.count('Ensure thing') == 4
+    assert 'footer' not in text
+
+
+def test_normalize_text_dehyphenates_and_collapses_whitespace():
+    text = TextNormalizer().normalize_text("config-\nuration   value  here\n\n\n\nnext  ")
+    assert text == "configuration value here\n\nnext"
+
+
+def test_estimate_tokens_rounds_up():
+    assert estimate_tokens('') == 0
+    assert estimate_tokens('abcde') == 2
@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+
+from src.models.token_usage import TokenUsageTracker
+
+
+def test_reserve_refuses_when_budget_would_be_exceeded():
+    tracker = TokenUsageTracker()
+    assert tracker.reserve('doc', 600, limit=1000)
+    assert not tracker.reserve('doc', 500, limit=1000)
+    assert tracker.reserve('doc', 400, limit=1000)
+    assert tracker.snapshot()['reserved'] == {'doc': 1000}
+
+
+def test_record_settles_reservation_to_actual_usage():
+    tracker = TokenUsageTracker()
+    tracker.reserve('doc', 500, limit=1000)
+    tracker.record('generate_script', estimated_prompt_tokens=500, prompt_tokens=450, completion_tokens=150,
+                   document_id='doc', reserved=500)
+
+    usage = tracker.snapshot()
+    assert usage['reserved'] == {}
+    assert usage['by_document']['doc']['total_tokens'] == 600
+    assert tracker.reserve('doc', 400, limit=1000)
+    assert not tracker.reserve('doc', 1, limit=1000)
+
+
+def test_release_returns_reservation():
+    tracker = TokenUsageTracker()
+    tracker.reserve('doc', 800, limit=1000)
+    tracker.release('doc', 800)
+    assert tracker.snapshot()['reserved'] == {}
+    assert tracker.reserve('doc', 1000, limit=1000)
+
+
+def test_concurrent_reservations_cannot_overshoot():
+    tracker = TokenUsageTracker()
+    barrier = threading.Barrier(50)
+    granted = []
+
+    def worker():
+        barrier.wait()
+        granted.append(tracker.reserve('doc', 100, limit=1000))
+
+    threads = [threading.Thread(target=worker) for _ in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert granted.count(True) == 10
+    assert tracker.snapshot()['reserved'] == {'doc': 1000}
+
+
+@pytest.fixture
+def compliance_ai():
+    pytest.importorskip('transformers')
+    from src.models.local_llm import LocalLLM
+    from src.models.model import ComplianceAI
+
+    # Skip __init__: no Gemini client or templates are needed to exercise budgets
+    ai = ComplianceAI.__new__(ComplianceAI)
+    ai.llm = LocalLLM(latency_ms=0, jitter_ms=0)
+    ai.token_usage = TokenUsageTracker()
+    ai.max_prompt_tokens = 30000
+    ai.max_document_tokens = 1000
+    return ai
+
+
+def _prompt(size):
+    from langchain import PromptTemplate
+    return PromptTemplate(template='x' * size + '{text}', input_variables=['text'])
+
+
+def test_run_chain_falls_back_when_document_budget_exceeded(compliance_ai):
+    assert compliance_ai._run_chain(_prompt(3000), {'text': ''}, 'generate_script', document_id='doc') is not None
+    assert compliance_ai._run_chain(_prompt(3000), {'text': ''}, 'generate_script', document_id='doc') is None
+
+    usage = compliance_ai.token_usage.snapshot()
+    assert usage['by_document']['doc']['calls'] == 1
+    assert usage['by_document']['doc']['fallbacks'] == 1
+    assert usage['reserved'] == {}
+
+
+def test_failed_call_releases_reservation(compliance_ai, monkeypatch):
+    from src.models.local_llm import LocalLLM
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('provider down')
+
+    monkeypatch.setattr(LocalLLM, '_call', fail)
+    with pytest.raises(RuntimeError):
+        compliance_ai._run_chain(_prompt(3000), {'text': ''}, 'generate_script', document_id='doc')
+    assert compliance_ai.token_usage.snapshot()['reserved'] == {}